@@ -0,0 +1,97 @@
+"""
+Real estate stored as bitboards.
+
+A set of vertices is a 54-bit Python int and a set of edges is a 72-bit
+Python int, with bit i set when item i is in the set. Moving from a set
+of items to the set of their neighbours is done with lookup tables that
+map each byte of the mask to the neighbours of the items in that byte,
+so it takes one table lookup and one OR per byte regardless of how many
+items are in the set.
+"""
+
+
+import numpy as np
+
+
+def get_mask(indicators):
+    packed = np.packbits(np.asarray(indicators, dtype=bool), bitorder="little")
+    mask = int.from_bytes(packed.tobytes(), "little")
+    return mask
+
+def get_indicators(mask, size):
+    packed = np.frombuffer(mask.to_bytes((size + 7) // 8, "little"), "uint8")
+    indicators = np.unpackbits(packed, count=size, bitorder="little")
+    return indicators.astype("int8")
+
+def get_indexes(mask):
+    indexes = []
+    while mask:
+        lowest_bit = mask & -mask
+        indexes.append(lowest_bit.bit_length() - 1)
+        mask ^= lowest_bit
+    return np.array(indexes, dtype=int)
+
+
+class Bitboard():
+
+    def __init__(self, topology):
+        self.vertex_count = topology.vertex_count
+        self.edge_count = topology.edge_count
+        self.edge_to_vertex = self.get_tables(topology.edge_vertices)
+        self.vertex_to_edge = self.get_tables(topology.vertex_edges)
+        self.vertex_to_vertex = self.get_tables(topology.vertex_vertices)
+
+    # Tables are built from the neighbour mask of each item. Each entry
+    # is found from an entry with one fewer bit set, so every table
+    # costs one OR per entry.
+    def get_tables(self, neighbours):
+        neighbour_masks = [
+            sum(1 << int(index) for index in row if index != -1)
+            for row in neighbours]
+        tables = [
+            self.get_table(neighbour_masks[offset: offset + 8])
+            for offset in range(0, len(neighbour_masks), 8)]
+        return tables
+
+    def get_table(self, neighbour_masks):
+        table = [0] * 256
+        for byte in range(1, 1 << len(neighbour_masks)):
+            lowest_bit = byte & -byte
+            table[byte] = (
+                table[byte ^ lowest_bit] |
+                neighbour_masks[lowest_bit.bit_length() - 1])
+        return table
+
+    def spread(self, mask, tables):
+        neighbours = 0
+        for table in tables:
+            neighbours |= table[mask & 255]
+            mask >>= 8
+        return neighbours
+
+
+    # Legal placements
+    
+    # A road can extend from any vertex the player has built on, or from
+    # the end of one of their roads unless an opponent has built there.
+    def get_buildable_roads(self, roads, vertices, opponent_vertices, occupied_edges):
+        road_vertices = self.spread(roads, self.edge_to_vertex)
+        reachable_vertices = (road_vertices & ~opponent_vertices) | vertices
+        buildable_roads = (
+            self.spread(reachable_vertices, self.vertex_to_edge)
+            & ~occupied_edges)
+        return buildable_roads
+
+    # No settlement can be within one edge of another settlement or city,
+    # and the vertex must be at the end of one of the player's roads.
+    def get_buildable_settlements(self, roads, occupied_vertices):
+        road_vertices = self.spread(roads, self.edge_to_vertex)
+        blocked_vertices = (
+            occupied_vertices |
+            self.spread(occupied_vertices, self.vertex_to_vertex))
+        buildable_settlements = road_vertices & ~blocked_vertices
+        return buildable_settlements
+
+    def get_buildable_cities(self, settlements, cities):
+        buildable_cities = settlements & ~cities
+        return buildable_cities
@@ -1,17 +1,20 @@
 import os
+import json
 
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import Polygon, Annulus
-from matplotlib.collections import PatchCollection
-from hgutilities.utils import json
 
 from Board.vertex import Vertex
 from Board.tile import Tile
 from Board.port import Port
-from utils import get_name
+from Board.edge import Edge
+from Board.compiled_board import get_compiled_board
+from Board.layout_generator import generate_layouts
+from Board.layout_store import LayoutStore
+from Board.topology import basis
+from utils import (
+    get_name,
+    dump_json)
 from global_variables import (
-    path_resources,
     path_layouts,
     tile_numbers,
     tile_types_list)
@@ -19,7 +22,6 @@ from global_variables import (
 
 class Board():
 
-    basis = np.array([[0, 1], [np.sin(np.pi/3), np.cos(np.pi/3)]])
     directions = np.array([
         [1, 0], [0, 1], [-1, 1],
         [-1, 0], [0, -1], [1, -1]])
@@ -27,14 +29,20 @@ class Board():
     def __init__(self, game):
         self.game = game
         self.log = game.log
-        np.random.seed(game.seed)
-        self.load_tile_definitions()
+        self.layout_name = None
+        self.layout_store = None
+        self.renderer = None
+        self.load_compiled_board()
         self.initialise_graph_components()
 
-    def load_tile_definitions(self):
-        path = os.path.join(path_resources, "Tile Definitions.json")
-        with open(path, "r") as file:
-            self.tile_definitions = json.load(file)
+    def load_compiled_board(self):
+        compiled_board = get_compiled_board()
+        self.tile_definitions = compiled_board.tile_definitions
+        self.topology = compiled_board.topology
+        self.bitboard = compiled_board.bitboard
+        self.symmetry = compiled_board.symmetry
+        self.features = compiled_board.features
+        self.compiled_board = compiled_board
 
     def initialise_graph_components(self):
         self.initialise_vertices()
@@ -46,44 +54,25 @@ class Board():
     # Vertices
 
     def initialise_vertices(self):
-        vertex_vectors = self.get_vertex_position_vectors()
         self.vertices = [
             Vertex(self, position_vector, index)
             for index, position_vector in
-            enumerate(vertex_vectors)]
-
-    def get_vertex_position_vectors(self):
-        path = os.path.join(path_resources, "Vertex Positions.json")
-        with open(path, "r") as file:
-            vertex_vectors = [tuple(vector) for vector in json.load(file)]
-        return vertex_vectors
+            enumerate(self.compiled_board.vertex_vectors)]
 
 
     # Tiles
 
     def initialise_tiles(self):
-        tiles_data = self.load_tiles_data()
         self.tiles = [
-            Tile(self, tile_definitions)
-            for tile_definitions in tiles_data]        
-
-    def load_tiles_data(self):
-        path = os.path.join(path_resources, "Tiles Data.json")
-        with open(path, "r") as file:
-            tiles_data = json.load(file)
-        return tiles_data
+            Tile(self, tile_data, index)
+            for index, tile_data in
+            enumerate(self.compiled_board.tiles_data)]
 
     def initialise_ports(self):
-        ports_data = self.get_ports_data()
         self.ports = [
-            Port(self, port_data)
-            for port_data in ports_data]
-
-    def get_ports_data(self):
-        path = os.path.join(path_resources, "Ports Data.json")
-        with open(path, "r") as file:
-            ports_data = json.load(file)
-        return ports_data
+            Port(self, port_data, index)
+            for index, port_data in
+            enumerate(self.compiled_board.ports_data)]
 
     def set_tile_states(self):
         self.tile_states = {
@@ -91,26 +80,15 @@ class Board():
                 tile.type == tile_type
                 for tile in self.tiles]).astype("int8")
             for tile_type in tile_types_list}
+        self.close_renderer()
 
 
     # Edges
 
     def initialise_edges(self):
-        self.edges = []
-        self.add_edges_around_tiles()
-        self.edges = np.array(self.edges)
-        self.extract_unique_edges()
-
-    def add_edges_around_tiles(self):
-        for tile in self.tiles:
-            edges_around_tile = tile.get_init_edges_around_tile()
-            self.edges = self.edges + edges_around_tile
-
-    def extract_unique_edges(self):
-        midpoints = np.array([
-            edge.get_midpoint() for edge in self.edges])
-        _, indexes = np.unique(midpoints, axis=0, return_index=True)
-        self.edges = self.edges[indexes]
+        self.edges = np.array([
+            Edge(self, self.vertices[vertex_1], self.vertices[vertex_2])
+            for vertex_1, vertex_2 in self.topology.edge_vertices])
 
 
     # Saving
@@ -125,9 +103,18 @@ class Board():
         path = self.get_path_tile_data(name)
         tile_data = self.get_tile_data()
         with open(path, "w+") as file:
-            json.dump(tile_data, file, indent=2)
+            dump_json(tile_data, file)
         self.log.info(f"Saving layout to {path}")
 
+    def get_layout_arrays(self):
+        tile_types = np.array([
+            tile_types_list.index(tile.type)
+            for tile in self.tiles], dtype="int8")
+        tile_numbers = np.array([
+            tile.number if tile.number is not None else 0
+            for tile in self.tiles], dtype="int8")
+        return tile_types, tile_numbers
+
     def get_tile_data(self):
         tile_data = [
             {"Type": tile.type,
@@ -149,11 +136,38 @@ class Board():
 
     # Loading
 
-    def load_layout(self, name):
+    def load_layout(self, name, store=None):
+        """
+        Loads a layout from its JSON file, or from a layout store when
+        one is given. The store can be a LayoutStore or its name, and
+        name is then any key of the store.
+        """
         self.log.info(f"Loading layout {name}")
+        if store is None:
+            self.load_layout_from_json(name)
+        else:
+            self.load_layout_from_store(name, store)
+        self.set_lookups()
+
+    def load_layout_from_json(self, name):
+        self.layout_store = None
         self.layout_name = name
         tile_data = self.load_tile_data()
         self.set_tile_data(tile_data)
+
+    def load_layout_from_store(self, key, store):
+        if not isinstance(store, LayoutStore):
+            store = LayoutStore(store)
+        self.layout_store = store.name
+        self.layout_name = store.get_name(key)
+        self.set_layout_arrays(*store.get(key))
+
+    # Layouts kept with a game are restored from their arrays, so they
+    # do not need to have been saved.
+    def load_layout_from_arrays(self, tile_types, tile_numbers, name=None, store=None):
+        self.layout_name = name
+        self.layout_store = store
+        self.set_layout_arrays(np.asarray(tile_types), np.asarray(tile_numbers))
         self.set_lookups()
 
     def load_tile_data(self):
@@ -171,41 +185,36 @@ class Board():
 
     # Produce layout
 
-    def generate_layout(self, name=None):
+    def generate_layout(self, name=None, separate_red_numbers=False):
         self.log.info("Generating layout")
-        self.set_generate_tile_types()
-        self.set_generate_tile_numbers()
+        tile_types, tile_numbers = generate_layouts(
+            1, self.topology, self.tile_definitions,
+            rng=self.game.random.layout,
+            separate_red_numbers=separate_red_numbers)
+        self.set_layout_arrays(tile_types[0], tile_numbers[0])
+        self.set_new_layout_name(name)
         self.save_layout(name)
         self.set_lookups()
 
-    def set_generate_tile_types(self):
-        tile_types = self.get_generated_tile_types()
-        for tile, tile_type in zip(self.tiles, tile_types):
-            tile.set_type(tile_type)
-
-    def get_generated_tile_types(self):
-        tile_types = [
-            tile_type
-            for tile_type, definition in self.tile_definitions.items()
-            for index in range(definition["Count"])]
-        np.random.shuffle(tile_types)
-        return tile_types
-
-    def set_generate_tile_numbers(self):
-        np.random.shuffle(tile_numbers)
-        index = 0
-        for tile in self.tiles:
-            if tile.type != "Desert":
-                tile.number = tile_numbers[index]
-                index += 1
-            else:
-                tile.number = None
+    def set_layout_arrays(self, tile_types, tile_numbers):
+        for tile, tile_type, tile_number in zip(
+                self.tiles, tile_types.tolist(), tile_numbers.tolist()):
+            tile.set_type(tile_types_list[tile_type])
+            tile.number = tile_number if tile_number != 0 else None
+        self.set_tile_states()
 
     def input_layout(self, name=None):
         self.set_tile_types_from_input()
         self.set_tile_numbers_from_input()
+        self.set_new_layout_name(name)
         self.save_layout(name)
 
+    # A new layout replaces the name and store of any layout loaded
+    # before it, and has no name unless one is given.
+    def set_new_layout_name(self, name):
+        self.layout_store = None
+        self.layout_name = name
+
     def set_tile_types_from_input(self):
         print(tile_types_prompt)
         for tile in self.tiles:
@@ -251,38 +260,32 @@ class Board():
     
 
     # Lookups
+    # Both lookups are indexed by [tile_index, neighbour_index]
 
     def set_lookups(self):
-        self.set_vertex_index_lookup_from_tile_and_vertex()
-        self.set_edge_index_lookup_from_tile_and_edge()
-
-    def set_vertex_index_lookup_from_tile_and_vertex(self):
-        self.vertex_index_lookup_from_tile_and_vertex = {
-            (tile_index, vertex_index): self.vertices.index(vertex)
-            for tile_index, tile in enumerate(self.tiles)
-            for vertex_index, vertex in enumerate(tile.vertices)}
-
-    def set_edge_index_lookup_from_tile_and_edge(self):
-        self.edge_index_lookup_from_tile_and_edge = {
-            (tile_index, edge_index): np.where(self.edges == edge)[0][0]
-            for tile_index, tile in enumerate(self.tiles)
-            for edge_index, edge in enumerate(
-                tile.get_edges_around_tile())}
+        self.vertex_index_lookup_from_tile_and_vertex = (
+            self.topology.tile_vertices)
+        self.edge_index_lookup_from_tile_and_edge = (
+            self.topology.tile_edges)
 
 
     # Plotting
 
+    # Matplotlib is imported by the plotting methods rather than with the
+    # module so that games can be simulated without loading it.
+
     def show_tiles(self):
+        import matplotlib.pyplot as plt
         self.initialise_plot_show()
         self.plot_layout()
         plt.show()
 
     def save_tiles(self):
-        self.initialise_plot_save()
-        self.plot_layout()
+        renderer = self.get_renderer()
+        renderer.clear()
         path = os.path.join(
             self.game.path, "Layout.pdf")
-        plt.savefig(path)
+        renderer.save(path)
         self.log.info(f"Saved board layout to {path}")
     
     def plot_layout(self):
@@ -292,6 +295,7 @@ class Board():
         self.set_x_and_y_plot_limits()
 
     def initialise_plot_show(self):
+        import matplotlib.pyplot as plt
         self.fig = plt.figure(figsize=(12, 8))
         self.ax = self.fig.add_axes([0, 0, 1, 1])
         self.ax.set_aspect("equal")
@@ -299,12 +303,15 @@ class Board():
         self.fig.patch.set_facecolor("#002240")
 
     def initialise_plot_save(self):
+        import matplotlib.pyplot as plt
         self.fig = plt.figure(figsize=(8, 8))
         self.ax = self.fig.add_axes([0, 0, 1, 1])
         self.ax.set_aspect("equal")
         self.ax.axis("off")
 
     def add_tiles_to_plot(self):
+        from matplotlib.patches import Polygon
+        from matplotlib.collections import PatchCollection
         polygons = PatchCollection(
             [Polygon([vertex.position for vertex in tile.vertices],
                      closed=True, facecolor=tile.color, edgecolor="k")
@@ -329,18 +336,22 @@ class Board():
                 self.ax.plot(*values, color=port.color, linewidth=6, zorder=-1)
 
     def add_port_circles_to_plot(self):
+        from matplotlib.patches import Circle
+        from matplotlib.collections import PatchCollection
         circles = PatchCollection(
-            [plt.Circle(port.position, 0.5, color=port.color)
+            [Circle(port.position, 0.5, color=port.color)
              for port in self.ports], match_original=True)
         self.ax.add_collection(circles)
 
     def add_port_text_to_plot(self):
+        from matplotlib.text import Text
         for port in self.ports:
-            self.ax.add_artist(plt.Text(
+            self.ax.add_artist(Text(
                 *port.position, str(port.ratio),
                 ha='center', va='center', fontsize=30))
 
     def plot_robber(self):
+        from matplotlib.patches import Annulus
         robber_tile = self.tiles[self.game.robber_index]
         annulus = Annulus(robber_tile.position, 0.5, 0.1, color="black")
         self.ax.add_patch(annulus)
@@ -354,18 +365,50 @@ class Board():
         self.ax.set_ylim(min_y, max_y)
 
     def show_board(self):
+        import matplotlib.pyplot as plt
         self.initialise_plot_show()
         self.plot_board()
         plt.show()
 
     def save_board(self):
-        self.initialise_plot_save()
-        self.plot_board()
+        renderer = self.get_renderer()
+        renderer.update(*self.get_board_state())
         path = os.path.join(
             self.game.path, f"BoardState_{self.game.move:04}.pdf")
-        plt.savefig(path)
+        renderer.save(path)
         self.log.info(f"Saved board state to {path}")
 
+    def get_board_state(self):
+        colors = [player.color for player in self.game.players]
+        board_state = (
+            self.game.get_real_estate(), colors, self.game.robber_index)
+        return board_state
+
+    def get_features(self):
+        features = self.features.get_features(
+            *self.get_layout_arrays(), self.game.get_real_estate(),
+            self.game.robber_index)
+        return features
+
+    def export_board_states(self, board_states, path):
+        self.get_renderer().export_pdf(board_states, path)
+        self.log.info(f"Exported board states to {path}")
+
+
+    # The layout is only drawn once for each renderer, so it is kept
+    # until the layout changes or it is closed.
+
+    def get_renderer(self):
+        if self.renderer is None:
+            from Board.renderer import BoardRenderer
+            self.renderer = BoardRenderer(self)
+        return self.renderer
+
+    def close_renderer(self):
+        if self.renderer is not None:
+            self.renderer.close()
+            self.renderer = None
+
     def plot_board(self):
         self.plot_layout()
         self.plot_roads()
@@ -391,7 +434,8 @@ class Board():
                 self.plot_vertex(vertex, color, size)
 
     def plot_vertex(self, vertex, color, size):
-        circle = plt.Circle(vertex.position, size, color=color, zorder=1.2)
+        from matplotlib.patches import Circle
+        circle = Circle(vertex.position, size, color=color, zorder=1.2)
         self.ax.add_patch(circle)
 
     def plot_roads(self):
@@ -466,7 +510,7 @@ class Board():
         return edge_state
 
     def get_position(self, vector):
-        position = np.dot(np.array(vector), self.basis)
+        position = np.dot(np.array(vector), basis)
         return position
 
 
@@ -503,9 +547,8 @@ class Board():
 
     def get_vertex_index_from_indexes(self, tile_number, tile_order, neighbour_index):
         tile_index = self.get_tile_index_from_indexes(tile_number, tile_order)
-        tile = self.tiles[tile_index]
         vertex_index = self.vertex_index_lookup_from_tile_and_vertex[
-            (tile_index, neighbour_index)]
+            tile_index, neighbour_index]
         return vertex_index
 
     def get_edge_indexes(self):
@@ -516,9 +559,8 @@ class Board():
 
     def get_edge_index_from_indexes(self, tile_number, tile_order, neighbour_index):
         tile_index = self.get_tile_index_from_indexes(tile_number, tile_order)
-        tile = self.tiles[tile_index]
         edge_index = self.edge_index_lookup_from_tile_and_edge[
-            (tile_index, neighbour_index)]
+            tile_index, neighbour_index]
         return edge_index
     
 
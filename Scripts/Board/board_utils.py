@@ -1,15 +1,82 @@
-def get_buildable_roads(edges):
-    vertices = get_vertices_from_edges(edges)
-    buildable_roads = list(set([
-        edge
-        for vertex in vertices
-        for edge in vertex.edges]))
+"""
+Legal placements of real estate for a batch of game states.
+
+Real estate is given as a dictionary with the same keys as
+PlayerRegular.real_estate, where each value stacks the arrays of every
+player along the second to last axis. A batch of N states therefore has
+shapes (N, 4, 54) for settlements and cities and (N, 4, 72) for roads,
+and a single state can be passed without the leading axis. The results
+are boolean masks over vertices or edges for the player being considered
+with the same leading axes as the input.
+
+The neighbourhood arrays of the topology are padded with -1, so a False
+column is appended to any state before it is indexed by them.
+"""
+
+
+import numpy as np
+
+
+def get_legal_placements(topology, real_estate, player_index):
+    settlements, cities, roads = get_player_real_estate(real_estate, player_index)
+    occupied_vertices, occupied_edges = get_occupied(real_estate)
+    vertices = settlements | cities
+    legal_placements = {
+        "Settlements": get_buildable_settlements(
+            topology, roads, occupied_vertices),
+        "Cities": get_buildable_cities(settlements, cities),
+        "Roads": get_buildable_roads(
+            topology, roads, vertices,
+            occupied_vertices & ~vertices, occupied_edges)}
+    return legal_placements
+
+def get_player_real_estate(real_estate, player_index):
+    player_real_estate = [
+        select_player(np.asarray(real_estate[key], dtype=bool), player_index)
+        for key in ["Settlements", "Cities", "Roads"]]
+    return player_real_estate
+
+# The player can either be the same for every state in the batch
+# or given separately for each state.
+def select_player(states, player_index):
+    if np.ndim(player_index) == 0:
+        return states[..., player_index, :]
+    else:
+        return states[np.arange(len(player_index)), player_index]
+
+def get_occupied(real_estate):
+    occupied_vertices = (
+        np.any(real_estate["Settlements"], axis=-2) |
+        np.any(real_estate["Cities"], axis=-2))
+    occupied_edges = np.any(real_estate["Roads"], axis=-2)
+    return occupied_vertices, occupied_edges
+
+# A road can extend from any vertex the player has built on, or from
+# the end of one of their roads unless an opponent has built there.
+def get_buildable_roads(topology, roads, vertices, opponent_vertices, occupied_edges):
+    road_vertices = get_any_neighbour(roads, topology.vertex_edges)
+    reachable_vertices = (road_vertices & ~opponent_vertices) | vertices
+    buildable_roads = (
+        get_any_neighbour(reachable_vertices, topology.edge_vertices)
+        & ~occupied_edges)
     return buildable_roads
 
-def get_vertices_from_edges(edges):
-    vertices = list(set([
-        vertex
-        for edge in self.edges
-        for vertex in edge.vertices]))
-    return vertices
+# No settlement can be within one edge of another settlement or city,
+# and the vertex must be at the end of one of the player's roads.
+def get_buildable_settlements(topology, roads, occupied_vertices):
+    road_vertices = get_any_neighbour(roads, topology.vertex_edges)
+    blocked_vertices = (
+        occupied_vertices |
+        get_any_neighbour(occupied_vertices, topology.vertex_vertices))
+    buildable_settlements = road_vertices & ~blocked_vertices
+    return buildable_settlements
+
+def get_buildable_cities(settlements, cities):
+    buildable_cities = settlements & ~cities
+    return buildable_cities
 
+def get_any_neighbour(states, neighbours):
+    padding = np.zeros((*states.shape[:-1], 1), dtype=bool)
+    padded_states = np.concatenate((states, padding), axis=-1)
+    any_neighbour = np.any(padded_states[..., neighbours], axis=-1)
+    return any_neighbour
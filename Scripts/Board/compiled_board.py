@@ -0,0 +1,165 @@
+"""
+The static parts of the board compiled into a single file.
+
+Everything a board reads from the resource files, together with the
+topology derived from them, is stored in one npz file next to the
+resources. The file records a hash of the resource files it was compiled
+from and is recompiled whenever they change. Within a process the
+compiled board is only read from disk once, and the resource files are
+only hashed again when their modification times or sizes change.
+"""
+
+
+import os
+import json
+import hashlib
+
+import numpy as np
+
+from Board.topology import Topology
+from Board.bitboard import Bitboard
+from Board.symmetry import Symmetry
+from Board.features import BoardFeatures
+from global_variables import path_resources
+
+
+path_compiled_board = os.path.join(path_resources, "Compiled Board.npz")
+
+source_file_names = [
+    "Tile Definitions.json",
+    "Vertex Positions.json",
+    "Tiles Data.json",
+    "Ports Data.json"]
+
+compiled_boards = {}
+
+source_hashes = {}
+
+
+class CompiledBoard():
+
+    def __init__(self, arrays):
+        self.topology = Topology.from_arrays(arrays)
+        self.bitboard = Bitboard(self.topology)
+        self.set_vertex_vectors(arrays)
+        self.set_tiles_data(arrays)
+        self.set_ports_data(arrays)
+        self.set_tile_definitions(arrays)
+        self.symmetry = Symmetry(self.topology, self.ports_data)
+        self.features = BoardFeatures(self.topology, self.symmetry)
+
+    def set_vertex_vectors(self, arrays):
+        self.vertex_vectors = [
+            tuple(vector) for vector in arrays["vertex_vectors"].tolist()]
+
+    def set_tiles_data(self, arrays):
+        self.tiles_data = [
+            {"Vector": vector, "Vertices": vertices}
+            for vector, vertices in zip(
+                arrays["tile_vectors"].tolist(),
+                arrays["tile_vertices"].tolist())]
+
+    def set_ports_data(self, arrays):
+        self.ports_data = [
+            {"Vector": vector, "Vertices": vertices,
+             "Type": port_type, "Ratio": ratio}
+            for vector, vertices, port_type, ratio in zip(
+                arrays["port_vectors"].tolist(),
+                arrays["port_vertices"].tolist(),
+                arrays["port_types"].tolist(),
+                arrays["port_ratios"].tolist())]
+
+    def set_tile_definitions(self, arrays):
+        self.tile_definitions = {
+            tile_type: {"Count": count, "Color": color}
+            for tile_type, count, color in zip(
+                arrays["definition_types"].tolist(),
+                arrays["definition_counts"].tolist(),
+                arrays["definition_colors"].tolist())}
+
+
+def get_compiled_board():
+    source_hash = get_source_hash()
+    if source_hash not in compiled_boards:
+        arrays = get_compiled_arrays(source_hash)
+        compiled_boards[source_hash] = CompiledBoard(arrays)
+    return compiled_boards[source_hash]
+
+def get_source_hash():
+    source_stamp = get_source_stamp()
+    if source_stamp not in source_hashes:
+        source_hashes[source_stamp] = hash_sources()
+    return source_hashes[source_stamp]
+
+def get_source_stamp():
+    source_stamp = tuple(
+        (stat.st_mtime_ns, stat.st_size)
+        for stat in (os.stat(os.path.join(path_resources, file_name))
+                     for file_name in source_file_names))
+    return source_stamp
+
+def hash_sources():
+    source_hash = hashlib.sha256()
+    for file_name in source_file_names:
+        with open(os.path.join(path_resources, file_name), "rb") as file:
+            source_hash.update(file.read())
+    return source_hash.hexdigest()
+
+def get_compiled_arrays(source_hash):
+    arrays = read_compiled_arrays()
+    if arrays is None or arrays["source_hash"] != source_hash:
+        arrays = compile_arrays(source_hash)
+        write_compiled_arrays(arrays)
+    return arrays
+
+def read_compiled_arrays():
+    if not os.path.exists(path_compiled_board):
+        return None
+    with np.load(path_compiled_board) as compiled_file:
+        arrays = dict(compiled_file)
+    return arrays
+
+# Written to a temporary file first so that processes starting at the
+# same time never read a partially written file.
+def write_compiled_arrays(arrays):
+    path_temporary = f"{path_compiled_board}.{os.getpid()}.tmp"
+    with open(path_temporary, "wb") as file:
+        np.savez(file, **arrays)
+    os.replace(path_temporary, path_compiled_board)
+
+
+# Compiling from the resource files
+
+def compile_arrays(source_hash):
+    sources = load_sources()
+    topology = Topology(sources["Tiles Data.json"], sources["Vertex Positions.json"])
+    arrays = (
+        {"source_hash": np.array(source_hash)}
+        | topology.get_arrays()
+        | get_port_arrays(sources["Ports Data.json"])
+        | get_definition_arrays(sources["Tile Definitions.json"]))
+    return arrays
+
+def load_sources():
+    sources = {}
+    for file_name in source_file_names:
+        with open(os.path.join(path_resources, file_name), "r") as file:
+            sources[file_name] = json.load(file)
+    return sources
+
+def get_port_arrays(ports_data):
+    port_arrays = {
+        "port_vectors": np.array([port["Vector"] for port in ports_data]),
+        "port_vertices": np.array([port["Vertices"] for port in ports_data]),
+        "port_types": np.array([port["Type"] for port in ports_data]),
+        "port_ratios": np.array([port["Ratio"] for port in ports_data])}
+    return port_arrays
+
+def get_definition_arrays(tile_definitions):
+    definition_arrays = {
+        "definition_types": np.array(list(tile_definitions)),
+        "definition_counts": np.array([
+            definition["Count"] for definition in tile_definitions.values()]),
+        "definition_colors": np.array([
+            definition["Color"] for definition in tile_definitions.values()])}
+    return definition_arrays
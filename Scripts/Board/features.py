@@ -0,0 +1,242 @@
+"""
+Input features of board positions for the neural network.
+
+Positions on the board are described in the discretised polar
+coordinates from the README. The radius is the ring, being the shortest
+number of steps to the centre tile, and the azimuth is the sector, being
+the closest of the twelve directions of the dihedral symmetry axes
+counting anticlockwise from the positive x axis. Items at the centre
+have no direction and their sector is -1. These and the extra neighbour
+arrays below only depend on the topology so are computed once.
+
+tile_rings:     (19,) 0 for the centre tile, 1 and 2 for the outer rings
+vertex_rings:   (54,) smallest ring of the tiles around each vertex
+edge_rings:     (72,) smallest ring of the two vertices of each edge
+tile_sectors:   (19,)
+vertex_sectors: (54,)
+edge_sectors:   (72,)
+tile_tiles:     (19, 6) tile across each edge in tile_edges, or -1
+edge_tiles:     (72, 2) tiles that each edge borders, padded with -1
+edge_edges:     (72, 4) edges sharing a vertex with each edge, padded with -1
+
+Features are given for tiles, vertices, and edges as float32 arrays of
+shape (..., count, channels). The static channels depend only on the
+layout and are cached by the hash of the layout, so evaluating a
+position only computes the dynamic channels from the real estate and the
+robber. The channels are named by get_channel_names.
+"""
+
+
+import numpy as np
+
+from Board.layout_generator import get_pips
+from Board.layout_store import (
+    get_records,
+    get_record_hash)
+from Board.symmetry import port_type_codes
+from Board.topology import basis
+from global_variables import (
+    tile_types_list,
+    resource_types)
+
+
+class BoardFeatures():
+
+    sector_count = 12
+    cache_size = 256
+
+    def __init__(self, topology, symmetry):
+        self.topology = topology
+        self.vertex_ports = symmetry.vertex_ports
+        self.set_neighbours()
+        self.set_rings()
+        self.set_sectors()
+        self.set_channel_names()
+        self.static_features = {}
+
+    @property
+    def ring_count(self):
+        return self.tile_rings.max() + 1
+
+
+    # Neighbours
+
+    def set_neighbours(self):
+        self.edge_tiles = self.topology.get_padded_inverse(
+            self.topology.tile_edges, self.topology.edge_count)
+        self.set_tile_tiles()
+        self.set_edge_edges()
+
+    def set_tile_tiles(self):
+        edge_tiles = self.edge_tiles[self.topology.tile_edges]
+        tile_indexes = np.arange(self.topology.tile_count).reshape(-1, 1)
+        self.tile_tiles = np.where(
+            edge_tiles[..., 0] == tile_indexes,
+            edge_tiles[..., 1], edge_tiles[..., 0])
+
+    def set_edge_edges(self):
+        edge_count = self.topology.edge_count
+        edge_edges = self.topology.vertex_edges[self.topology.edge_vertices]
+        edge_edges = edge_edges.reshape(edge_count, -1)
+        edge_indexes = np.arange(edge_count).reshape(-1, 1)
+        missing = (edge_edges == -1) | (edge_edges == edge_indexes)
+        edge_edges = np.sort(np.where(missing, edge_count, edge_edges), axis=1)
+        edge_edges = edge_edges[:, :(~missing).sum(axis=1).max()]
+        self.edge_edges = np.where(edge_edges == edge_count, -1, edge_edges)
+
+
+    # Polar coordinates
+
+    # The rings of the tiles are found by a breadth first search outwards
+    # from the centre tile over tile_tiles.
+    def set_rings(self):
+        self.tile_rings = np.full(self.topology.tile_count, -1)
+        ring = [self.centre_tile]
+        ring_index = 0
+        while len(ring) > 0:
+            self.tile_rings[ring] = ring_index
+            neighbours = self.tile_tiles[ring].ravel()
+            neighbours = neighbours[neighbours != -1]
+            ring = np.unique(neighbours[self.tile_rings[neighbours] == -1])
+            ring_index += 1
+        self.vertex_rings = get_padded_minimum(
+            self.tile_rings, self.topology.vertex_tiles)
+        self.edge_rings = self.vertex_rings[self.topology.edge_vertices].min(axis=1)
+
+    @property
+    def centre_tile(self):
+        positions = self.topology.tile_vectors @ basis
+        return np.linalg.norm(positions, axis=1).argmin()
+
+    def set_sectors(self):
+        vertex_vectors = self.topology.vertex_vectors
+        edge_vectors = vertex_vectors[self.topology.edge_vertices].mean(axis=1)
+        self.tile_sectors = self.get_sectors(self.topology.tile_vectors)
+        self.vertex_sectors = self.get_sectors(vertex_vectors)
+        self.edge_sectors = self.get_sectors(edge_vectors)
+
+    def get_sectors(self, vectors):
+        centre = self.topology.tile_vectors[self.centre_tile]
+        positions = (vectors - centre) @ basis
+        angles = np.arctan2(positions[:, 1], positions[:, 0])
+        sectors = np.round(angles * self.sector_count / (2 * np.pi)).astype(int)
+        sectors = sectors % self.sector_count
+        sectors[np.linalg.norm(positions, axis=1) < 1e-6] = -1
+        return sectors
+
+
+    # Static features
+
+    def set_channel_names(self):
+        ring_names = [f"Ring {ring}" for ring in range(self.ring_count)]
+        self.static_channel_names = {
+            "Tiles": (
+                [f"Type {tile_type}" for tile_type in tile_types_list]
+                + ["Pips"] + ring_names),
+            "Vertices": (
+                ["Port None"] + [f"Port {port_type}" for port_type in port_type_codes]
+                + [f"Pips {resource}" for resource in resource_types]
+                + ring_names),
+            "Edges": ring_names}
+
+    def get_channel_names(self, player_count):
+        players = range(player_count)
+        dynamic_channel_names = {
+            "Tiles": ["Robber"],
+            "Vertices": (
+                [f"Settlements {player}" for player in players]
+                + [f"Cities {player}" for player in players]),
+            "Edges": [f"Roads {player}" for player in players]}
+        channel_names = {
+            component: names + dynamic_channel_names[component]
+            for component, names in self.static_channel_names.items()}
+        return channel_names
+
+    def get_static_features(self, tile_types, tile_numbers):
+        """
+        Returns the static channels of a single layout given as two (19,)
+        arrays in the format of Board.get_layout_arrays.
+        """
+        layout_hash = get_record_hash(get_records(tile_types, tile_numbers)[0])
+        if layout_hash not in self.static_features:
+            if len(self.static_features) >= self.cache_size:
+                del self.static_features[next(iter(self.static_features))]
+            self.static_features[layout_hash] = self.compute_static_features(
+                np.asarray(tile_types), np.asarray(tile_numbers))
+        return self.static_features[layout_hash]
+
+    def compute_static_features(self, tile_types, tile_numbers):
+        pips = get_pips(tile_numbers).astype("float32")
+        static_features = {
+            "Tiles": np.concatenate((
+                get_one_hot(tile_types, len(tile_types_list)),
+                pips.reshape(-1, 1),
+                get_one_hot(self.tile_rings, self.ring_count)), axis=1),
+            "Vertices": np.concatenate((
+                get_one_hot(self.vertex_ports, len(port_type_codes) + 1),
+                self.get_vertex_resource_pips(tile_types, pips),
+                get_one_hot(self.vertex_rings, self.ring_count)), axis=1),
+            "Edges": get_one_hot(self.edge_rings, self.ring_count)}
+        for features in static_features.values():
+            features.flags.writeable = False
+        return static_features
+
+    def get_vertex_resource_pips(self, tile_types, pips):
+        tile_resource_pips = get_one_hot(tile_types, len(tile_types_list))[:, :-1]
+        tile_resource_pips = np.vstack((
+            tile_resource_pips * pips.reshape(-1, 1),
+            np.zeros((1, len(resource_types)), dtype="float32")))
+        vertex_resource_pips = tile_resource_pips[self.topology.vertex_tiles].sum(axis=1)
+        return vertex_resource_pips
+
+
+    # Dynamic features
+
+    def get_dynamic_features(self, real_estate, robber_index):
+        """
+        Returns the channels that change during a game. The real estate
+        is given as in board_utils, with arrays of shape (..., P, count),
+        and robber_index is an int or an array matching the batch axes.
+        The players are ordered as in the real estate arrays.
+        """
+        robber_index = np.asarray(robber_index)
+        robber = (
+            np.arange(self.topology.tile_count) == robber_index[..., np.newaxis])
+        dynamic_features = {
+            "Tiles": robber[..., np.newaxis].astype("float32"),
+            "Vertices": np.concatenate((
+                get_player_channels(real_estate["Settlements"]),
+                get_player_channels(real_estate["Cities"])), axis=-1),
+            "Edges": get_player_channels(real_estate["Roads"])}
+        return dynamic_features
+
+    def get_features(self, tile_types, tile_numbers, real_estate, robber_index):
+        """
+        Returns the static channels of the layout followed by the dynamic
+        channels of the position. Positions can be batched over leading
+        axes of the real estate and robber index, and all positions in a
+        batch share the layout.
+        """
+        static_features = self.get_static_features(tile_types, tile_numbers)
+        dynamic_features = self.get_dynamic_features(real_estate, robber_index)
+        features = {
+            component: np.concatenate((
+                np.broadcast_to(
+                    static_features[component],
+                    (*dynamic_features[component].shape[:-1],
+                     static_features[component].shape[-1])),
+                dynamic_features[component]), axis=-1)
+            for component in static_features}
+        return features
+
+
+def get_padded_minimum(values, indexes):
+    padded_values = np.append(values, values.max() + 1)
+    return padded_values[indexes].min(axis=1)
+
+def get_one_hot(codes, size):
+    return (np.asarray(codes)[..., np.newaxis] == np.arange(size)).astype("float32")
+
+# Moves the player axis of (..., P, count) real estate to the end.
+def get_player_channels(real_estate):
+    return np.moveaxis(np.asarray(real_estate, dtype="float32"), -2, -1)
@@ -0,0 +1,132 @@
+"""
+Generating and scoring board layouts in batches.
+
+A batch of N layouts is a pair of int8 arrays of shape (N, 19). The first
+gives the type of each tile as an index into tile_types_list and the
+second gives the number on each tile, with 0 for the desert. No Board
+objects are created, so millions of layouts can be generated at once.
+"""
+
+
+import numpy as np
+
+from global_variables import (
+    tile_numbers,
+    tile_types_list,
+    resource_types)
+
+
+desert_code = tile_types_list.index("Desert")
+red_numbers = [6, 8]
+
+
+def generate_layouts(count, topology, tile_definitions, rng=None,
+                     separate_red_numbers=False):
+    """
+    Generates count random layouts. If separate_red_numbers is True then
+    no two tiles sharing an edge both have a 6 or an 8, and layouts that
+    break this are regenerated until every layout is valid.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    tile_type_pool = get_tile_type_pool(tile_definitions)
+    layout_types = np.zeros((count, tile_type_pool.size), dtype="int8")
+    layout_numbers = np.zeros((count, tile_type_pool.size), dtype="int8")
+    tile_pairs = get_neighbouring_tile_pairs(topology)
+    invalid = np.arange(count)
+    while invalid.size > 0:
+        layout_types[invalid], layout_numbers[invalid] = get_shuffled_layouts(
+            invalid.size, tile_type_pool, rng)
+        if separate_red_numbers:
+            invalid = invalid[get_has_neighbouring_red_numbers(
+                layout_numbers[invalid], tile_pairs)]
+        else:
+            invalid = invalid[:0]
+    return layout_types, layout_numbers
+
+def get_tile_type_pool(tile_definitions):
+    tile_type_pool = np.array([
+        tile_types_list.index(tile_type)
+        for tile_type, definition in tile_definitions.items()
+        for _ in range(definition["Count"])], dtype="int8")
+    return tile_type_pool
+
+# Each row is shuffled by sorting random keys. The numbers are then
+# placed in order on the tiles that are not the desert, and as every row
+# has the same number of these the assignment is a single masked write.
+def get_shuffled_layouts(count, tile_type_pool, rng):
+    type_order = rng.random((count, tile_type_pool.size)).argsort(axis=1)
+    layout_types = tile_type_pool[type_order]
+    number_pool = np.array(tile_numbers, dtype="int8")
+    number_order = rng.random((count, number_pool.size)).argsort(axis=1)
+    layout_numbers = np.zeros(layout_types.shape, dtype="int8")
+    layout_numbers[layout_types != desert_code] = number_pool[number_order].ravel()
+    return layout_types, layout_numbers
+
+def get_neighbouring_tile_pairs(topology):
+    tile_indexes = np.repeat(np.arange(topology.tile_count), 6)
+    edges = topology.tile_edges.ravel()
+    order = np.argsort(edges, kind="stable")
+    edges, tile_indexes = edges[order], tile_indexes[order]
+    shared = (edges[1:] == edges[:-1])
+    tile_pairs = np.stack((tile_indexes[:-1][shared], tile_indexes[1:][shared]), axis=1)
+    return tile_pairs
+
+def get_has_neighbouring_red_numbers(layout_numbers, tile_pairs):
+    red = np.isin(layout_numbers, red_numbers)
+    has_neighbouring_red_numbers = np.any(
+        red[:, tile_pairs[:, 0]] & red[:, tile_pairs[:, 1]], axis=1)
+    return has_neighbouring_red_numbers
+
+
+# Metrics
+
+def get_pips(layout_numbers):
+    pips = np.where(layout_numbers > 0, 6 - np.abs(7 - layout_numbers), 0)
+    return pips.astype("int8")
+
+def get_layout_metrics(topology, ports_data, layout_types, layout_numbers):
+    """
+    Returns a dictionary of metrics for each layout in the batch.
+
+    Resource Pips:      (N, 5) total pips of each resource
+    Vertex Pips:        (N, 54) total pips of the tiles around each vertex
+    Vertex Pip Maximum: (N,) largest entry of Vertex Pips
+    Port Vertex Pips:   (N, 9) largest Vertex Pips of the two port vertices
+    Port Resource Pips: (N, 9) total pips of the resource a port trades,
+                        or of all resources for a variety port
+    """
+    pips = get_pips(layout_numbers).astype(int)
+    resource_pips = get_resource_pips(layout_types, pips)
+    vertex_pips = get_vertex_pips(topology, pips)
+    metrics = {
+        "Resource Pips": resource_pips,
+        "Vertex Pips": vertex_pips,
+        "Vertex Pip Maximum": vertex_pips.max(axis=1),
+        "Port Vertex Pips": get_port_vertex_pips(ports_data, vertex_pips),
+        "Port Resource Pips": get_port_resource_pips(ports_data, resource_pips)}
+    return metrics
+
+def get_resource_pips(layout_types, pips):
+    resource_codes = np.arange(len(resource_types)).reshape(-1, 1)
+    resource_pips = np.sum(
+        (layout_types[:, np.newaxis, :] == resource_codes) * pips[:, np.newaxis, :],
+        axis=2)
+    return resource_pips
+
+def get_vertex_pips(topology, pips):
+    padded_pips = np.concatenate((pips, np.zeros((pips.shape[0], 1), dtype=int)), axis=1)
+    vertex_pips = padded_pips[:, topology.vertex_tiles].sum(axis=2)
+    return vertex_pips
+
+def get_port_vertex_pips(ports_data, vertex_pips):
+    port_vertices = np.array([port["Vertices"] for port in ports_data])
+    port_vertex_pips = vertex_pips[:, port_vertices].max(axis=2)
+    return port_vertex_pips
+
+def get_port_resource_pips(ports_data, resource_pips):
+    port_resources = np.array([
+        [port["Type"] in [resource, "Variety"] for resource in resource_types]
+        for port in ports_data])
+    port_resource_pips = resource_pips @ port_resources.T
+    return port_resource_pips
@@ -0,0 +1,215 @@
+"""
+Many layouts stored together in one binary file.
+
+Each layout is a fixed width record of 38 bytes, being the 19 tile type
+codes followed by the 19 tile numbers in the format produced by the
+layout generator. The records file is memory-mapped so any layout can be
+read by its row without loading the others. An index file alongside it
+has one tab separated line per record giving the name and hash of the
+layout, and both files are only ever appended to. Records are written
+before their index lines, so the index decides which records are in the
+store. A write that was cut short is cut off both files when the store
+is next opened.
+
+Layouts can be looked up by row, name, or hash.
+"""
+
+
+import os
+import json
+import hashlib
+
+import numpy as np
+
+from utils import dump_json
+from global_variables import (
+    path_layouts,
+    tile_types_list)
+
+
+tile_count = 19
+record_size = 2 * tile_count
+
+
+class LayoutStore():
+
+    def __init__(self, name):
+        self.name = name
+        self.path_records = os.path.join(path_layouts, f"{name}.layouts")
+        self.path_index = os.path.join(path_layouts, f"{name}.index")
+        self.load_index()
+        self.load_records()
+
+    def __len__(self):
+        return len(self.names)
+
+    def load_index(self):
+        self.names, self.hashes = [], []
+        if os.path.exists(self.path_index):
+            with open(self.path_index, "rb") as file:
+                lines = file.read().split(b"\n")
+            for line in lines[:-1]:
+                name, layout_hash = line.decode("utf-8").split("\t")
+                self.names.append(name)
+                self.hashes.append(layout_hash)
+            if lines[-1] != b"":
+                truncate(self.path_index, sum(len(line) + 1 for line in lines[:-1]))
+        self.set_lookups()
+
+    def set_lookups(self):
+        self.rows_from_names = {name: row for row, name in enumerate(self.names)}
+        self.rows_from_hashes = {}
+        for row, layout_hash in enumerate(self.hashes):
+            self.rows_from_hashes.setdefault(layout_hash, row)
+
+    def load_records(self):
+        if os.path.exists(self.path_records):
+            truncate(self.path_records, len(self) * record_size)
+        if len(self) == 0:
+            self.records = np.zeros((0, record_size), dtype="int8")
+        else:
+            self.records = np.memmap(
+                self.path_records, dtype="int8", mode="r",
+                shape=(len(self), record_size))
+
+
+    # Reading
+
+    def get_row(self, key):
+        if isinstance(key, (int, np.integer)):
+            return int(key)
+        elif key in self.rows_from_names:
+            return self.rows_from_names[key]
+        elif key in self.rows_from_hashes:
+            return self.rows_from_hashes[key]
+        else:
+            raise KeyError(f"Layout {key} not found in layout store {self.name}")
+
+    def get_name(self, key):
+        return self.names[self.get_row(key)]
+
+    def get(self, key):
+        record = self.records[self.get_row(key)]
+        tile_types, tile_numbers = np.array(record).reshape(2, tile_count)
+        return tile_types, tile_numbers
+
+    def get_batch(self, rows):
+        records = np.array(self.records[rows])
+        return records[:, :tile_count], records[:, tile_count:]
+
+    def __contains__(self, key):
+        return key in self.rows_from_names or key in self.rows_from_hashes
+
+
+    # Writing
+
+    def append(self, tile_types, tile_numbers, names=None, skip_duplicates=False):
+        """
+        Appends a batch of layouts given as (N, 19) arrays. Layouts are
+        named by their hash when no names are given. Returns the rows of
+        the layouts in the store, which for a skipped duplicate is the
+        row of the copy already there.
+        """
+        records = get_records(tile_types, tile_numbers)
+        hashes = [get_record_hash(record) for record in records]
+        names = hashes if names is None else list(names)
+        keep = self.get_rows_to_keep(names, hashes, skip_duplicates)
+        start = len(self)
+        self.write(records[keep], [names[row] for row in keep], [hashes[row] for row in keep])
+        rows = [self.get_row(layout_hash) for layout_hash in hashes]
+        for offset, row in enumerate(keep):
+            rows[row] = start + offset
+        return rows
+
+    # Names are checked before anything is written, so a batch with a
+    # bad name leaves the store as it was.
+    def get_rows_to_keep(self, names, hashes, skip_duplicates):
+        keep, new_names, new_hashes = [], set(), set()
+        for row, (name, layout_hash) in enumerate(zip(names, hashes)):
+            if skip_duplicates and (layout_hash in self.rows_from_hashes
+                                    or layout_hash in new_hashes):
+                continue
+            check_name(name)
+            if name in self.rows_from_names or name in new_names:
+                raise ValueError(f"Layout {name} is already in layout store {self.name}")
+            keep.append(row)
+            new_names.add(name)
+            new_hashes.add(layout_hash)
+        return keep
+
+    def write(self, records, names, hashes):
+        with open(self.path_records, "ab") as file:
+            file.write(records.tobytes())
+        with open(self.path_index, "a", encoding="utf-8") as file:
+            for name, layout_hash in zip(names, hashes):
+                file.write(f"{name}\t{layout_hash}\n")
+        self.names += names
+        self.hashes += hashes
+        self.set_lookups()
+        self.load_records()
+
+
+    # Converting from and to the JSON layout format
+
+    def import_json(self, names, skip_duplicates=False):
+        tile_data = [load_tile_data(name) for name in names]
+        tile_types, tile_numbers = zip(*[
+            get_layout_arrays_from_tile_data(data) for data in tile_data])
+        rows = self.append(
+            np.array(tile_types), np.array(tile_numbers),
+            names=names, skip_duplicates=skip_duplicates)
+        return rows
+
+    def export_json(self, key, name=None):
+        if name is None:
+            name = self.get_name(key)
+        tile_data = get_tile_data_from_layout_arrays(*self.get(key))
+        path = os.path.join(path_layouts, f"{name}.json")
+        with open(path, "w+") as file:
+            dump_json(tile_data, file)
+        return path
+
+
+# The index is tab separated with one line per layout.
+def check_name(name):
+    if not isinstance(name, str) or name == "" or any(
+            character in name for character in "\t\r\n"):
+        raise ValueError(f"Invalid layout name {name!r}")
+
+# Only ever shortens a file, as growing one would pad it with zeros.
+def truncate(path, size):
+    if os.path.getsize(path) > size:
+        with open(path, "r+b") as file:
+            file.truncate(size)
+
+def get_records(tile_types, tile_numbers):
+    records = np.concatenate(
+        (np.atleast_2d(tile_types), np.atleast_2d(tile_numbers)),
+        axis=1).astype("int8")
+    return records
+
+def get_record_hash(record):
+    record_hash = hashlib.blake2b(
+        np.ascontiguousarray(record).tobytes(), digest_size=8).hexdigest()
+    return record_hash
+
+def load_tile_data(name):
+    path = os.path.join(path_layouts, f"{name}.json")
+    with open(path, "r") as file:
+        tile_data = json.load(file)
+    return tile_data
+
+def get_layout_arrays_from_tile_data(tile_data):
+    tile_types = np.array([
+        tile_types_list.index(tile["Type"]) for tile in tile_data], dtype="int8")
+    tile_numbers = np.array([
+        tile["Number"] if tile["Number"] is not None else 0
+        for tile in tile_data], dtype="int8")
+    return tile_types, tile_numbers
+
+def get_tile_data_from_layout_arrays(tile_types, tile_numbers):
+    tile_data = [
+        {"Type": tile_types_list[tile_type],
+         "Number": tile_number if tile_number != 0 else None}
+        for tile_type, tile_number in zip(tile_types.tolist(), tile_numbers.tolist())]
+    return tile_data
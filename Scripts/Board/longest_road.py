@@ -0,0 +1,185 @@
+"""
+Longest road lengths for each player, updated incrementally.
+
+The roads of a player are split into connected components, where two
+roads are connected if they share a vertex that no opponent has built
+on. Each component stores its edges as a bitmask and the length of the
+longest trail within it. Buying a road only recomputes the component it
+joins, and buying a settlement only recomputes the components of other
+players that pass through that vertex.
+
+A trail can end at a vertex an opponent has built on but cannot pass
+through it. Finding the longest trail is a depth first search over the
+edges of a single component, which is small enough to be cheap.
+"""
+
+
+import numpy as np
+
+
+class LongestRoad():
+
+    def __init__(self, game):
+        self.game = game
+        self.players = game.players
+        topology = game.board.topology
+        self.edge_vertices = topology.edge_vertices.tolist()
+        self.vertex_edges = [
+            [edge for edge in edges if edge != -1]
+            for edges in topology.vertex_edges.tolist()]
+        self.initialise_components()
+
+    def initialise_components(self):
+        self.components = [
+            self.get_components(player, player.real_estate_masks["Roads"])
+            for player in self.players]
+
+    def get_lengths(self):
+        lengths = [
+            max([length for _, length in components], default=0)
+            for components in self.components]
+        return lengths
+
+    def get_length(self, player):
+        player_index = self.players.index(player)
+        return self.get_lengths()[player_index]
+
+
+    # Updating
+
+    def add_road(self, player, edge_index):
+        player_index = self.players.index(player)
+        blocked = self.get_blocked_vertices(player)
+        joined, others = self.split_joined_components(
+            self.components[player_index], edge_index, blocked)
+        edges = joined | (1 << int(edge_index))
+        self.components[player_index] = others + [
+            [edges, self.get_trail_length(edges, blocked)]]
+
+    def add_vertex(self, player, vertex_index):
+        for other in self.players:
+            if other is not player:
+                self.split_components(other, vertex_index)
+
+    def split_components(self, player, vertex_index):
+        player_index = self.players.index(player)
+        vertex_edges = self.get_vertex_edges_mask(vertex_index)
+        components = []
+        for edges, length in self.components[player_index]:
+            if edges & vertex_edges:
+                components += self.get_components(player, edges)
+            else:
+                components.append([edges, length])
+        self.components[player_index] = components
+
+
+    # Hypothetical roads
+
+    def get_lengths_with_roads(self, player, edge_indexes):
+        """
+        Returns the longest road length the player would have after
+        buying each of the given roads, one road at a time.
+        """
+        player_index = self.players.index(player)
+        components = self.components[player_index]
+        blocked = self.get_blocked_vertices(player)
+        trail_lengths = {}
+        lengths = np.zeros(len(edge_indexes), dtype=int)
+        for index, edge_index in enumerate(edge_indexes):
+            lengths[index] = self.get_length_with_road(
+                components, edge_index, blocked, trail_lengths)
+        return lengths
+
+    def get_length_with_road(self, components, edge_index, blocked, trail_lengths):
+        joined, others = self.split_joined_components(
+            components, edge_index, blocked)
+        edges = joined | (1 << int(edge_index))
+        if edges not in trail_lengths:
+            trail_lengths[edges] = self.get_trail_length(edges, blocked)
+        length = max(
+            [trail_lengths[edges]] + [length for _, length in others])
+        return length
+
+
+    # Components
+
+    def get_blocked_vertices(self, player):
+        blocked = 0
+        for other in self.players:
+            if other is not player:
+                blocked |= (
+                    other.real_estate_masks["Settlements"] |
+                    other.real_estate_masks["Cities"])
+        return blocked
+
+    def get_vertex_edges_mask(self, vertex_index):
+        vertex_edges = 0
+        for edge in self.vertex_edges[vertex_index]:
+            vertex_edges |= 1 << edge
+        return vertex_edges
+
+    def split_joined_components(self, components, edge_index, blocked):
+        joining_edges = 0
+        for vertex in self.edge_vertices[edge_index]:
+            if not blocked >> vertex & 1:
+                joining_edges |= self.get_vertex_edges_mask(vertex)
+        joined, others = 0, []
+        for edges, length in components:
+            if edges & joining_edges:
+                joined |= edges
+            else:
+                others.append([edges, length])
+        return joined, others
+
+    def get_components(self, player, edges):
+        blocked = self.get_blocked_vertices(player)
+        components = []
+        while edges:
+            component = self.get_component(edges & -edges, edges, blocked)
+            components.append(
+                [component, self.get_trail_length(component, blocked)])
+            edges &= ~component
+        return components
+
+    def get_component(self, component, edges, blocked):
+        frontier = component
+        while frontier:
+            edge = (frontier & -frontier).bit_length() - 1
+            frontier &= frontier - 1
+            for vertex in self.edge_vertices[edge]:
+                if not blocked >> vertex & 1:
+                    neighbours = (
+                        self.get_vertex_edges_mask(vertex)
+                        & edges & ~component)
+                    component |= neighbours
+                    frontier |= neighbours
+        return component
+
+
+    # Trails
+
+    def get_trail_length(self, edges, blocked):
+        start_vertices = set(
+            vertex
+            for edge in range(edges.bit_length()) if edges >> edge & 1
+            for vertex in self.edge_vertices[edge])
+        trail_length = max(
+            self.extend_trail(vertex, edges, blocked)
+            for vertex in start_vertices)
+        return trail_length
+
+    def extend_trail(self, vertex, edges, blocked):
+        trail_length = 0
+        for edge in self.vertex_edges[vertex]:
+            if edges >> edge & 1:
+                trail_length = max(trail_length, 1 + self.extend_trail_along(
+                    vertex, edge, edges & ~(1 << edge), blocked))
+        return trail_length
+
+    def extend_trail_along(self, vertex, edge, edges, blocked):
+        vertex_1, vertex_2 = self.edge_vertices[edge]
+        next_vertex = vertex_2 if vertex_1 == vertex else vertex_1
+        if blocked >> next_vertex & 1:
+            return 0
+        else:
+            return self.extend_trail(next_vertex, edges, blocked)
@@ -0,0 +1,105 @@
+"""
+Trading resources with the bank at the best ratio each player has.
+
+Every resource can be traded with the bank at bank_ratio cards for one.
+A settlement or city on a port vertex gives its ratio, either for every
+resource on a variety port or for one resource on the others. The ratio
+given by each vertex is a (54, 5) lookup, and the ratios of the players
+are a (4, 5) array of the lowest ratio over the vertices they have built
+on, which is lowered whenever they build on a port.
+
+A chain of bank trades in one turn is given by how many trades give
+away each resource and how many of each resource are received. Both are
+enumerated as small integer vectors, and a pair is kept when the same
+number of cards are received as trades made and no resource is both
+given and received. The result is the change to the player's cards for
+each chain, in the same format as the trades between players.
+"""
+
+
+import numpy as np
+
+from trade_candidates import (
+    decode_trades,
+    get_card_changes)
+from global_variables import resource_types
+
+
+bank_ratio = 4
+
+receive_vectors = {}
+
+
+class Maritime():
+
+    def __init__(self, game):
+        self.game = game
+        self.vertex_ratios = get_vertex_ratios(
+            game.board.topology.vertex_count, game.board.compiled_board.ports_data)
+        self.set_ratios(game.get_real_estate())
+
+    def set_ratios(self, real_estate):
+        self.ratios = get_trade_ratios(
+            self.vertex_ratios, real_estate["Settlements"], real_estate["Cities"])
+
+    def add_vertex(self, player, vertex_index):
+        player_index = self.game.players.index(player)
+        self.ratios[player_index] = np.minimum(
+            self.ratios[player_index], self.vertex_ratios[vertex_index])
+
+    def get_trades(self, player, cards, max_trades=1):
+        player_index = self.game.players.index(player)
+        holdings = np.array([cards[resource] for resource in resource_types])
+        return get_bank_trades(holdings, self.ratios[player_index], max_trades)
+
+
+def get_vertex_ratios(vertex_count, ports_data):
+    vertex_ratios = np.full((vertex_count, len(resource_types)), bank_ratio)
+    for port_data in ports_data:
+        if port_data["Type"] in resource_types:
+            resources = resource_types.index(port_data["Type"])
+        else:
+            resources = slice(None)
+        vertex_ratios[port_data["Vertices"], resources] = np.minimum(
+            vertex_ratios[port_data["Vertices"], resources], port_data["Ratio"])
+    return vertex_ratios
+
+def get_trade_ratios(vertex_ratios, settlements, cities):
+    """
+    Finds the ratio of every resource for any number of players, given
+    settlements and cities of shape (..., 54). Returns (..., 5).
+    """
+    occupied = (np.asarray(settlements, dtype=bool) | np.asarray(cities, dtype=bool))
+    ratios = np.where(occupied[..., np.newaxis], vertex_ratios, bank_ratio)
+    return ratios.min(axis=-2)
+
+def get_bank_trades(holdings, ratios, max_trades=1):
+    """
+    Enumerates every chain of between 1 and max_trades bank trades that
+    the holdings can pay for. Returns the changes to the player's cards
+    keyed by card type, with one entry per chain.
+    """
+    given = get_given_vectors(holdings, ratios, max_trades)
+    received = get_receive_vectors(max_trades)
+    given_counts, received_counts = given.sum(axis=1), received.sum(axis=1)
+    pairs = (
+        (given_counts[:, np.newaxis] == received_counts)
+        & ~np.any((given[:, np.newaxis] > 0) & (received > 0), axis=2))
+    given_indexes, received_indexes = np.nonzero(pairs)
+    changes = received[received_indexes] - given[given_indexes] * ratios
+    return get_card_changes(changes)
+
+def get_given_vectors(holdings, ratios, max_trades):
+    radices = np.minimum(holdings // ratios, max_trades) + 1
+    given = decode_trades(0, int(np.prod(radices)), radices)
+    given_counts = given.sum(axis=1)
+    return given[(given_counts >= 1) & (given_counts <= max_trades)]
+
+def get_receive_vectors(max_trades):
+    if max_trades not in receive_vectors:
+        radices = np.full(len(resource_types), max_trades + 1)
+        received = decode_trades(0, int(np.prod(radices)), radices)
+        received_counts = received.sum(axis=1)
+        receive_vectors[max_trades] = received[
+            (received_counts >= 1) & (received_counts <= max_trades)]
+    return receive_vectors[max_trades]
@@ -0,0 +1,126 @@
+"""
+Resources produced by each dice roll, stored as a tensor of shape
+(11, 4, 5) indexed by [dice - 2, player, resource].
+
+Settlements produce one resource from each tile they border and cities
+produce two. The tile under the robber produces nothing. The tensor is
+updated incrementally whenever a settlement or city is bought or the
+robber moves, so distributing resources after a roll is a single row
+lookup.
+"""
+
+
+import numpy as np
+
+from global_variables import resource_types
+
+
+dice_values = np.arange(2, 13)
+
+# A city is built on a settlement which stays marked, so it adds one
+# to the weight the settlement already gives.
+vertex_weights = {
+    "Settlements": 1,
+    "Cities": 1}
+
+
+class Production():
+
+    def __init__(self, game):
+        self.game = game
+        self.topology = game.board.topology
+        self.set_tile_arrays(game.board.tiles)
+        self.set_tile_weights(game.players)
+        self.set_tensor(game.robber_index)
+
+    def set_tile_arrays(self, tiles):
+        self.tile_resources, self.tile_numbers = get_tile_arrays(tiles)
+        self.productive = (self.tile_resources != -1)
+
+    def set_tile_weights(self, players):
+        weights = np.array([
+            sum(weight * player.real_estate[vertex_type]
+                for vertex_type, weight in vertex_weights.items())
+            for player in players])
+        self.tile_weights = (
+            weights[:, self.topology.tile_vertices].sum(axis=2).T)
+
+    def set_tensor(self, robber_index):
+        self.tensor = np.zeros((dice_values.size, len(self.game.players),
+                                len(resource_types)), dtype=int)
+        producing = self.productive.copy()
+        producing[robber_index] = False
+        for tile_index in np.nonzero(producing)[0]:
+            self.add_tile(tile_index, self.tile_weights[tile_index])
+
+    def add_tile(self, tile_index, weights):
+        dice_index = self.tile_numbers[tile_index] - 2
+        resource_index = self.tile_resources[tile_index]
+        self.tensor[dice_index, :, resource_index] += weights
+
+    def get_resources_gained(self, dice):
+        return self.tensor[dice - 2]
+
+
+    # Updating
+
+    def add_vertex(self, player, vertex_type, vertex_index):
+        player_index = self.game.players.index(player)
+        weight = vertex_weights[vertex_type]
+        tile_indexes = self.topology.vertex_tiles[vertex_index]
+        tile_indexes = tile_indexes[tile_indexes != -1]
+        self.tile_weights[tile_indexes, player_index] += weight
+        weights = np.zeros(len(self.game.players), dtype=int)
+        weights[player_index] = weight
+        for tile_index in tile_indexes:
+            if self.productive[tile_index] and tile_index != self.game.robber_index:
+                self.add_tile(tile_index, weights)
+
+    def move_robber(self, old_index, new_index):
+        if self.productive[old_index]:
+            self.add_tile(old_index, self.tile_weights[old_index])
+        if self.productive[new_index]:
+            self.add_tile(new_index, -self.tile_weights[new_index])
+
+
+def get_tile_arrays(tiles):
+    tile_resources = np.array([
+        resource_types.index(tile.type) if tile.type in resource_types else -1
+        for tile in tiles])
+    tile_numbers = np.array([
+        tile.number if tile.number is not None else 0
+        for tile in tiles])
+    return tile_resources, tile_numbers
+
+def get_production_tensors(topology, tile_resources, tile_numbers,
+                           robber_indexes, weights):
+    """
+    Builds the production tensors for a batch of N games at once.
+
+    tile_resources: (N, 19) index into resource_types, -1 for the desert
+    tile_numbers:   (N, 19) number on each tile, 0 for the desert
+    robber_indexes: (N,) tile the robber is on
+    weights:        (N, players, 54) 1 for a settlement and 2 for a city
+
+    Returns an array of shape (N, 11, players, 5).
+    """
+    count, player_count = weights.shape[:2]
+    tile_weights = weights[..., topology.tile_vertices].sum(axis=-1)
+    producing = (tile_resources != -1)
+    producing[np.arange(count), robber_indexes] = False
+    games, tiles = np.nonzero(producing)
+    tensors = np.zeros((count, dice_values.size, len(resource_types), player_count),
+                       dtype=int)
+    np.add.at(
+        tensors,
+        (games, tile_numbers[games, tiles] - 2, tile_resources[games, tiles]),
+        tile_weights[games, :, tiles])
+    return tensors.transpose(0, 1, 3, 2)
+
+def get_resources_gained(tensors, dice):
+    """
+    Looks up the resources gained from a roll in each of a batch of
+    production tensors, giving an array of shape (N, players, 5).
+    """
+    resources_gained = tensors[np.arange(len(dice)), dice - 2]
+    return resources_gained
@@ -0,0 +1,170 @@
+"""
+Rendering board states to files without redrawing the layout.
+
+The layout (tiles, numbers, and ports) is drawn once when the renderer is
+created. Roads, settlements, cities, and the robber are each a single
+collection or patch that is updated in place for every board state, so
+drawing a move only changes the data of four artists. Figures are made
+directly rather than through pyplot so they are never left open, and
+close must be called once the renderer is no longer needed.
+
+A board state is given by real estate stacked over the players as in
+Game.get_real_estate, the colors of the players, and the robber index.
+"""
+
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.patches import Polygon, Annulus, Circle
+from matplotlib.collections import (
+    PatchCollection,
+    LineCollection,
+    EllipseCollection)
+
+
+class BoardRenderer():
+
+    vertex_sizes = {
+        "Settlements": 0.2,
+        "Cities": 0.3}
+
+    def __init__(self, board, figsize=(8, 8)):
+        self.board = board
+        self.fig = Figure(figsize=figsize)
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_axes([0, 0, 1, 1])
+        self.ax.set_aspect("equal")
+        self.ax.axis("off")
+        self.set_positions()
+        self.draw_static()
+        self.initialise_dynamic()
+
+    def set_positions(self):
+        self.vertex_positions = np.array(
+            [vertex.position for vertex in self.board.vertices])
+        self.edge_segments = self.vertex_positions[
+            self.board.topology.edge_vertices]
+
+
+    # Static layer
+
+    def draw_static(self):
+        self.draw_tiles()
+        self.draw_numbers()
+        self.draw_ports()
+        self.set_limits()
+
+    def draw_tiles(self):
+        polygons = PatchCollection(
+            [Polygon(self.vertex_positions[self.board.topology.tile_vertices[index]],
+                     closed=True, facecolor=tile.color, edgecolor="k")
+             for index, tile in enumerate(self.board.tiles)],
+            match_original=True)
+        self.ax.add_collection(polygons)
+
+    def draw_numbers(self):
+        for tile in self.board.tiles:
+            if tile.number is not None:
+                self.ax.text(
+                    *tile.position, tile.number,
+                    ha="center", va="center", fontsize=30)
+
+    def draw_ports(self):
+        piers = LineCollection(
+            [[vertex.position, port.position]
+             for port in self.board.ports for vertex in port.vertices],
+            colors=[port.color for port in self.board.ports for _ in port.vertices],
+            linewidths=6, zorder=-1)
+        self.ax.add_collection(piers)
+        circles = PatchCollection(
+            [Circle(port.position, 0.5, color=port.color)
+             for port in self.board.ports], match_original=True)
+        self.ax.add_collection(circles)
+        for port in self.board.ports:
+            self.ax.text(
+                *port.position, str(port.ratio),
+                ha="center", va="center", fontsize=30)
+
+    def set_limits(self):
+        positions = np.array(
+            [obj.position for obj in self.board.vertices + self.board.ports])
+        min_x, min_y = np.min(positions, axis=0)*1.15
+        max_x, max_y = np.max(positions, axis=0)*1.15
+        self.ax.set_xlim(min_x, max_x)
+        self.ax.set_ylim(min_y, max_y)
+
+
+    # Dynamic layer
+
+    def initialise_dynamic(self):
+        self.roads = LineCollection([], linewidths=9, zorder=1.1)
+        self.ax.add_collection(self.roads)
+        self.vertices = {
+            vertex_type: self.get_vertex_collection()
+            for vertex_type in self.vertex_sizes}
+        self.robber = Annulus((0, 0), 0.5, 0.1, color="black", visible=False)
+        self.ax.add_patch(self.robber)
+
+    def get_vertex_collection(self):
+        collection = EllipseCollection(
+            [], [], [], units="xy", offsets=np.zeros((0, 2)),
+            offset_transform=self.ax.transData, zorder=1.2)
+        self.ax.add_collection(collection)
+        return collection
+
+    def update(self, real_estate, colors, robber_index=None):
+        self.update_roads(real_estate["Roads"], colors)
+        for vertex_type, size in self.vertex_sizes.items():
+            self.update_vertices(
+                self.vertices[vertex_type], real_estate[vertex_type], colors, size)
+        self.update_robber(robber_index)
+
+    def clear(self):
+        empty_real_estate = {
+            "Settlements": np.zeros((0, self.vertex_positions.shape[0])),
+            "Cities": np.zeros((0, self.vertex_positions.shape[0])),
+            "Roads": np.zeros((0, self.edge_segments.shape[0]))}
+        self.update(empty_real_estate, [])
+
+    def update_roads(self, roads, colors):
+        players, edges = np.nonzero(roads)
+        self.roads.set_segments(self.edge_segments[edges])
+        self.roads.set_color([colors[player] for player in players])
+
+    def update_vertices(self, collection, indicators, colors, size):
+        players, vertices = np.nonzero(indicators)
+        diameters = np.full(vertices.size, 2 * size)
+        collection.set_offsets(self.vertex_positions[vertices])
+        collection.set_widths(diameters)
+        collection.set_heights(diameters)
+        collection.set_angles(np.zeros(vertices.size))
+        collection.set_facecolor([colors[player] for player in players])
+
+    def update_robber(self, robber_index):
+        if robber_index is None:
+            self.robber.set_visible(False)
+        else:
+            self.robber.set_center(self.board.tiles[robber_index].position)
+            self.robber.set_visible(True)
+
+
+    # Output
+
+    def save(self, path):
+        self.fig.savefig(path)
+
+    def export_pdf(self, board_states, path):
+        """
+        Writes every board state as one page of a PDF. Each board state
+        is a tuple of the arguments taken by update.
+        """
+        with PdfPages(path) as pdf:
+            for board_state in board_states:
+                self.update(*board_state)
+                pdf.savefig(self.fig)
+
+    def close(self):
+        self.fig.clear()
+        self.fig = None
@@ -0,0 +1,169 @@
+"""
+The dihedral symmetry group of the board.
+
+The board is invariant under the six rotations by multiples of 60
+degrees and the six reflections, giving twelve transforms. For each
+transform the tiles, vertices, edges, and port sites are permuted, and
+the permutations are stored as arrays of shape (12, count) such that
+
+    transformed_state[..., i] = state[..., permutation[transform, i]]
+
+The first transform is the identity. The port sites are not preserved by
+every transform as there are nine of them, and where a port site is
+moved onto a coastal position without a port the entry is -1. Ports are
+instead included in canonical forms through the port type of each
+vertex, which permutes like any other vertex state.
+
+A canonical form of a state is the lexicographically smallest of its
+twelve transformed states, so all equivalent states share the same
+canonical form and hash.
+"""
+
+
+import hashlib
+
+import numpy as np
+
+from Board.topology import basis
+from global_variables import tile_types_list
+
+
+port_type_codes = {
+    port_type: code
+    for code, port_type in enumerate(["Variety"] + tile_types_list[:-1], 1)}
+
+
+class Symmetry():
+
+    transform_count = 12
+
+    def __init__(self, topology, ports_data):
+        self.topology = topology
+        self.set_matrices()
+        self.tiles = self.get_permutations(topology.tile_vectors)
+        self.vertices = self.get_permutations(topology.vertex_vectors)
+        self.edges = self.get_edge_permutations()
+        port_vectors = np.array([port["Vector"] for port in ports_data])
+        self.ports = self.get_permutations(port_vectors, allow_missing=True)
+        self.set_vertex_ports(ports_data)
+
+    def set_matrices(self):
+        angles = np.arange(6) * np.pi / 3
+        cos, sin = np.cos(angles), np.sin(angles)
+        rotations = np.stack((
+            np.stack((cos, -sin), axis=-1),
+            np.stack((sin, cos), axis=-1)), axis=-2)
+        reflection = np.array([[-1, 0], [0, 1]])
+        self.matrices = np.concatenate((rotations, rotations @ reflection))
+
+    # Transforms are applied in Cartesian coordinates and each image is
+    # matched to the closest original position.
+    def get_permutations(self, vectors, allow_missing=False):
+        positions = vectors @ basis
+        transformed = np.einsum("gij,nj->gni", self.matrices, positions)
+        distances = np.linalg.norm(
+            transformed[:, :, np.newaxis, :] - positions, axis=-1)
+        images = distances.argmin(axis=2)
+        matched = (distances.min(axis=2) < 1e-6)
+        if not allow_missing and not np.all(matched):
+            raise ValueError("The board is not symmetric under the dihedral group")
+        images = np.where(matched, images, -1)
+        return self.get_inverse(images)
+
+    def get_inverse(self, images):
+        permutations = np.full(images.shape, -1)
+        transforms, items = np.nonzero(images != -1)
+        permutations[transforms, images[transforms, items]] = items
+        return permutations
+
+    def get_edge_permutations(self):
+        edge_lookup = {
+            tuple(vertices): index
+            for index, vertices in enumerate(self.topology.edge_vertices.tolist())}
+        vertex_images = self.get_inverse(self.vertices)
+        edge_images = np.sort(vertex_images[:, self.topology.edge_vertices], axis=-1)
+        edge_images = np.array([
+            [edge_lookup[tuple(vertices)] for vertices in transform_edges]
+            for transform_edges in edge_images.tolist()])
+        return self.get_inverse(edge_images)
+
+    def set_vertex_ports(self, ports_data):
+        self.vertex_ports = np.zeros(self.topology.vertex_count, dtype="int8")
+        for port in ports_data:
+            self.vertex_ports[port["Vertices"]] = port_type_codes[port["Type"]]
+
+
+    # Canonical forms
+
+    def get_transformed_states(self, tile_types, tile_numbers, real_estate=None,
+                               include_ports=True):
+        """
+        Returns every transform of the given state as an int8 array of
+        shape (..., 12, length) with any leading batch axes kept.
+
+        tile_types:   (..., 19) index into tile_types_list
+        tile_numbers: (..., 19) number on each tile, 0 for the desert
+        real_estate:  optional dictionary of arrays shaped as in board_utils
+        """
+        tile_types = np.asarray(tile_types)
+        batch_shape = tile_types.shape[:-1]
+        components = [
+            tile_types[..., self.tiles],
+            np.asarray(tile_numbers)[..., self.tiles]]
+        if include_ports:
+            components.append(np.broadcast_to(
+                self.vertex_ports[self.vertices],
+                (*batch_shape, self.transform_count, self.topology.vertex_count)))
+        if real_estate is not None:
+            components += self.get_transformed_real_estate(real_estate, batch_shape)
+        states = np.concatenate(components, axis=-1).astype("int8")
+        return states
+
+    def get_transformed_real_estate(self, real_estate, batch_shape):
+        transformed_real_estate = [
+            np.asarray(real_estate[real_estate_type])[..., permutations]
+            .swapaxes(-2, -3)
+            .reshape(*batch_shape, self.transform_count, -1)
+            for real_estate_type, permutations in zip(
+                ["Settlements", "Cities", "Roads"],
+                [self.vertices, self.vertices, self.edges])]
+        return transformed_real_estate
+
+    def get_canonical(self, *args, **kwargs):
+        """
+        Takes the same arguments as get_transformed_states and returns
+        the canonical state and the index of the transform that gives it.
+        """
+        states = self.get_transformed_states(*args, **kwargs)
+        transforms = get_lexicographic_minimum(states)
+        canonical = np.take_along_axis(
+            states, transforms[..., np.newaxis, np.newaxis], axis=-2)
+        return canonical.squeeze(axis=-2), transforms
+
+    def get_hash(self, *args, **kwargs):
+        canonical, _ = self.get_canonical(*args, **kwargs)
+        if canonical.ndim == 1:
+            return get_state_hash(canonical)
+        hashes = [
+            get_state_hash(state)
+            for state in canonical.reshape(-1, canonical.shape[-1])]
+        return np.array(hashes).reshape(canonical.shape[:-1])
+
+
+# Finds the lexicographically smallest of the transformed states by
+# removing candidates one column at a time until only one is left.
+def get_lexicographic_minimum(states):
+    flat_states = states.reshape(-1, *states.shape[-2:])
+    candidates = np.ones(flat_states.shape[:2], dtype=bool)
+    for column in range(flat_states.shape[-1]):
+        if np.all(candidates.sum(axis=1) == 1):
+            break
+        values = np.where(candidates, flat_states[..., column], np.iinfo("int8").max)
+        candidates &= (values == values.min(axis=1, keepdims=True))
+    transforms = candidates.argmax(axis=1)
+    return transforms.reshape(states.shape[:-2])
+
+def get_state_hash(state):
+    state_hash = hashlib.blake2b(
+        np.ascontiguousarray(state).tobytes(), digest_size=8).hexdigest()
+    return state_hash
@@ -0,0 +1,128 @@
+"""
+The board graph as fixed-shape integer arrays.
+
+The layout of the tiles, vertices, and edges never changes, so all
+adjacency information is computed once and stored as index arrays.
+Rows of a vertex or edge neighbourhood that have fewer neighbours than
+the width of the array are padded with -1. Appending a single False
+column to a state array before indexing with these arrays means the
+padding reads as "no neighbour" without any masking.
+
+tile_vertices:   (19, 6) vertices around each tile, clockwise from the top
+tile_edges:      (19, 6) edges around each tile, clockwise from top right
+edge_vertices:   (72, 2) the two vertices of each edge, lowest index first
+vertex_edges:    (54, 3) edges meeting at each vertex
+vertex_vertices: (54, 3) vertices one edge away from each vertex
+vertex_tiles:    (54, 3) tiles that each vertex borders
+"""
+
+
+import numpy as np
+
+
+# Tile and vertex vectors are in a basis adapted to the hexagons, and
+# multiplying by basis gives their positions in the plane.
+basis = np.array([[0, 1], [np.sin(np.pi/3), np.cos(np.pi/3)]])
+
+
+class Topology():
+
+    array_names = [
+        "tile_vectors", "vertex_vectors",
+        "tile_vertices", "tile_edges", "edge_vertices",
+        "vertex_edges", "vertex_vertices", "vertex_tiles"]
+
+    def __init__(self, tiles_data, vertex_vectors):
+        self.tile_vectors = np.array(
+            [tile_data["Vector"] for tile_data in tiles_data])
+        self.vertex_vectors = np.array(vertex_vectors)
+        self.tile_vertices = np.array(
+            [tile_data["Vertices"] for tile_data in tiles_data])
+        self.set_edges()
+        self.set_vertex_neighbourhoods()
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        topology = cls.__new__(cls)
+        for name in cls.array_names:
+            setattr(topology, name, arrays[name])
+        return topology
+
+    def get_arrays(self):
+        arrays = {
+            name: getattr(self, name)
+            for name in self.array_names}
+        return arrays
+
+    @property
+    def tile_count(self):
+        return self.tile_vertices.shape[0]
+
+    @property
+    def vertex_count(self):
+        return self.vertex_vectors.shape[0]
+
+    @property
+    def edge_count(self):
+        return self.edge_vertices.shape[0]
+
+
+    # Edges
+
+    # Each tile contributes the six edges between consecutive vertices.
+    # Edges shared by two tiles are merged by their midpoints, and the
+    # sorted order of the midpoints defines the edge indexes.
+    def set_edges(self):
+        vertex_pairs = self.get_tile_vertex_pairs()
+        midpoints = self.vertex_vectors[vertex_pairs].sum(axis=2)
+        _, first, inverse = np.unique(
+            midpoints.reshape(-1, 2), axis=0,
+            return_index=True, return_inverse=True)
+        self.edge_vertices = vertex_pairs.reshape(-1, 2)[first]
+        self.set_tile_edges(inverse.reshape(self.tile_count, 6))
+
+    def get_tile_vertex_pairs(self):
+        vertex_offset = np.roll(self.tile_vertices, -1, axis=1)
+        vertex_pairs = np.stack((self.tile_vertices, vertex_offset), axis=2)
+        vertex_pairs = np.sort(vertex_pairs, axis=2)
+        return vertex_pairs
+
+    def set_tile_edges(self, tile_edges):
+        tile_edges = np.sort(tile_edges, axis=1)
+        midpoint_vectors = (
+            self.vertex_vectors[self.edge_vertices[tile_edges]].mean(axis=2)
+            - self.tile_vectors[:, np.newaxis, :])
+        angles = np.arctan2(midpoint_vectors[..., 0], midpoint_vectors[..., 1])
+        order = angles.argsort(axis=1)[:, [3, 2, 1, 0, 5, 4]]
+        self.tile_edges = np.take_along_axis(tile_edges, order, axis=1)
+
+
+    # Vertices
+
+    def set_vertex_neighbourhoods(self):
+        self.vertex_edges = self.get_padded_inverse(self.edge_vertices)
+        self.vertex_tiles = self.get_padded_inverse(self.tile_vertices)
+        self.set_vertex_vertices()
+
+    # Turns a map from items to vertices into a map from vertices to
+    # items, with each row in increasing order and padded with -1. Any
+    # other map of items into count indexes is inverted the same way.
+    def get_padded_inverse(self, item_indexes, count=None):
+        count = self.vertex_count if count is None else count
+        indexes = item_indexes.ravel()
+        items = np.repeat(np.arange(item_indexes.shape[0]), item_indexes.shape[1])
+        order = np.lexsort((items, indexes))
+        indexes, items = indexes[order], items[order]
+        counts = np.bincount(indexes, minlength=count)
+        columns = np.arange(indexes.size) - np.repeat(np.cumsum(counts) - counts, counts)
+        inverse = np.full((count, counts.max()), -1)
+        inverse[indexes, columns] = items
+        return inverse
+
+    def set_vertex_vertices(self):
+        edge_vertices = np.vstack((self.edge_vertices, [[-1, -1]]))
+        neighbour_pairs = edge_vertices[self.vertex_edges]
+        vertex_indexes = np.arange(self.vertex_count).reshape(-1, 1)
+        self.vertex_vertices = np.where(
+            neighbour_pairs[..., 0] == vertex_indexes,
+            neighbour_pairs[..., 1], neighbour_pairs[..., 0])
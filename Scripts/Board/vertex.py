@@ -7,8 +7,8 @@ vertex: this is the position with respect to a basis adapted to
 position: this is the position in Cartesian coordinates. This
     is used for graphical representations of the board.
 
-polar: this is not used explicitly, but will be evident in
-    the structure of neural network.
+polar: this is the ring and sector of the vertex given in
+    Board.features, and is used for the input of the neural network.
 """
 
 
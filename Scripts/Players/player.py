@@ -1,6 +1,3 @@
-from hgutilities.utils import get_dict_string
-
-
 class Player():
 
     def __init__(self, game, name):
@@ -1,6 +1,4 @@
-from hgutilities.utils import json
 import numpy as np
-import pandas as pd
 
 from Players.player import Player
 from Players.state_utils import (
@@ -31,37 +29,17 @@ class PlayerPerspective(Player):
 
     def update_state_self(self, card_type, change):
         state = self.card_state[card_type]
-        self.card_state[card_type] = (
-            get_self_states(card_type, state, change))
+        state[:] = get_self_states(card_type, state, change)
 
     def update_state_other(self, card_type, change):
         state = self.card_state[card_type]
-        self.card_state[card_type] = (
-            get_updated_states(card_type, state, change))
+        state[:] = get_updated_states(card_type, state, change)
 
-    def get_initial_states(self):
-        card_states = self.get_initial_states_card()
-        real_estate_states = self.get_initial_states_real_estate()
-        states = card_states | real_estate_states
-        return states
-
-    def get_initial_states_card(self):
-        card_states = {
-            card_type: distribution.reshape(1, -1)
-            for card_type, distribution in self.card_state.items()}
-        return card_states
-
-    def get_initial_states_real_estate(self):
-        real_estate_states = {
-            real_estate_type: distribution.reshape(1, -1)
-            for real_estate_type, distribution in self.them.geometry_state.items()}
-        return real_estate_states
-
-    def update_states(self, card_type, actor_changes, count):
+    # The arena already holds the current state in every row, so only
+    # the perspectives of the players trading are written.
+    def update_states(self, card_type, actor_changes):
         if self.them in actor_changes:
             self.update_states_change(card_type, actor_changes[self.them])
-        else:
-            self.update_states_stack(card_type, count)
 
     def update_states_change(self, card_type, changes):
         if self.base is self.them:
@@ -78,13 +56,9 @@ class PlayerPerspective(Player):
         state = self.card_state[card_type]
         states = get_updated_states(card_type, state, change)
         self.base.trade.update_states(self.index, card_type, states)
-
-    def update_states_stack(self, card_type, count):
-        state = self.card_state[card_type]
-        states = np.tile(state, (count, 1))
-        self.base.trade.update_states(self.index, card_type, states)
     
     def get_df(self):
+        import pandas as pd
         df = {
             (card_type, count): card_count_probability
             for card_type, card_distribution in self.card_state.items()
@@ -1,8 +1,9 @@
 import numpy as np
-import pandas as pd
 
 from Players.player import Player
 from Players.player_perspective import PlayerPerspective
+from Board.bitboard import get_mask
+from snapshot import get_card_state
 from global_variables import card_types
 
 
@@ -23,10 +24,18 @@ class PlayerRegular(Player):
         self.set_initial_real_estate()
 
     def set_initial_real_estate(self):
-        self.real_estate = {
-            "Settlements": np.zeros(len(self.game.board.vertices)).astype("int8"),
-            "Cities": np.zeros(len(self.game.board.vertices)).astype("int8"),
-            "Roads": np.zeros(len(self.game.board.edges)).astype("int8")}
+        for indicators in self.real_estate.values():
+            indicators[:] = 0
+        self.set_real_estate_masks()
+
+    def set_real_estate_masks(self):
+        self.real_estate_masks = {
+            real_estate_type: get_mask(indicators)
+            for real_estate_type, indicators in self.real_estate.items()}
+
+    def add_real_estate(self, real_estate_type, index):
+        self.real_estate[real_estate_type][index] = 1
+        self.real_estate_masks[real_estate_type] |= 1 << int(index)
 
     def get_state(self):
         perspective_states = self.get_perspective_states()
@@ -46,15 +55,22 @@ class PlayerRegular(Player):
         self.load_perspectives_from_state(state)
 
     def load_real_estate_from_state(self, state):
-        self.real_estate = {
-            key: np.array(state[key])
-            for key in ["Settlements", "Cities", "Roads"]}
+        for key in ["Settlements", "Cities", "Roads"]:
+            self.real_estate[key][:] = state[key]
+        self.set_real_estate_masks()
     
     def load_perspectives_from_state(self, state):
         for perspective in self.perspectives:
-            perspective.card_state = {
-                card_type: np.array(distribution)
-                for card_type, distribution in state[perspective.name].items()}
+            for card_type, distribution in state[perspective.name].items():
+                perspective.card_state[card_type][:] = distribution
+
+    # The arrays are views into the game state and are used without copying.
+    def set_from_arrays(self, real_estate, card_states):
+        self.real_estate = real_estate
+        self.set_real_estate_masks()
+        for perspective, flat_card_state in zip(self.perspectives, card_states):
+            perspective.flat_card_state = flat_card_state
+            perspective.card_state = get_card_state(flat_card_state)
 
     def get_perspective_state(self, player_name):
         perspective = [
@@ -73,7 +89,7 @@ class PlayerRegular(Player):
         card_state = self.perspectives[0].card_state
         self.ensure_valid_card_state(card_state)
         self.cards = {
-            card_type: int(np.where(distribution == 1)[0])
+            card_type: int(np.where(distribution == 1)[0][0])
             for card_type, distribution in card_state.items()}
 
     # Both these tests ensure that a player has no uncertainty in their own
@@ -102,15 +118,9 @@ class PlayerRegular(Player):
         total_is_correct = (sum(distribution_totals) == 11)
         return total_is_correct
 
-    def get_resources_gained(self, tile):
-        vertex_values = (
-            1 * self.real_estate["Settlements"] +
-            2 * self.real_estate["Cities"])
-        resources_gained = np.sum(vertex_values * tile.vertex_indicators)
-        return resources_gained
-
     def update_state(self, actor, card_type, change):
-        self.log.debug(f"Updating state of {actor.name} for {card_type} with change {change}")
+        self.log.debug(
+            "Updating state of %s for %s with change %s", actor.name, card_type, change)
         self.perspectives[0].update_state_self(card_type, change)
         for perspective in self.perspectives[1:]:
             perspective.update_state_other(actor, card_type, change)
@@ -121,6 +131,7 @@ class PlayerRegular(Player):
             perspective.update_states_other(actor, card_type, changes)
 
     def get_card_df(self):
+        import pandas as pd
         perspective_dfs = [
             self.perspectives[(4 - index) % 4].get_df()
             for index in self.perspective_indexes]
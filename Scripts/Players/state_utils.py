@@ -142,8 +142,28 @@ def get_self_states_no_change(card_type, state, change):
     return state
 
 def get_self_states_change(card_type, state, change):
-    card_count = int(np.where(state == 1)[0])
+    card_count = int(np.where(state == 1)[0][0])
     indexes = card_count + change
     state = np.zeros((change.size, card_sizes[card_type]))
     state[np.arange(change.size), indexes] = 1
     return state
+
+
+# Shifts a batch of distributions of shape (..., size) by a batch of
+# changes of shape (...) in one step, giving the same result for each
+# distribution as get_updated_states. As a distribution that is certain
+# stays certain when shifted, this also updates a player's own states.
+def get_shifted_states(card_type, states, changes):
+    size = card_sizes[card_type]
+    indexes = np.arange(size) - np.asarray(changes)[..., np.newaxis]
+    valid = (indexes >= 0) & (indexes < size)
+    shifted_states = np.where(
+        valid, np.take_along_axis(states, indexes.clip(0, size - 1), axis=-1), 0)
+    denominators = shifted_states.sum(axis=-1, keepdims=True)
+    invalid_states = (denominators[..., 0] == 0)
+    if np.any(invalid_states):
+        raise_warning_zero_state(card_type)
+        shifted_states[invalid_states] = guessed_states[card_type]
+        denominators[invalid_states] = 1
+    shifted_states = (shifted_states / denominators).round(6)
+    return shifted_states
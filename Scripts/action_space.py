@@ -0,0 +1,360 @@
+"""
+A fixed numbering of every action a player can choose.
+
+Actions are laid out in sections in the order of section_names, and the
+id of an action is the offset of its section plus its index within the
+section.
+
+End Turn:        ending the turn, which is passing in the simulator
+Settlements:     building a settlement on a vertex
+Cities:          building a city on a vertex
+Roads:           building a road on an edge
+Robber:          moving the robber onto a tile
+Buy Development: buying a development card
+Knight:          playing a knight, followed by a Robber action
+Road Builder:    playing a road builder, followed by two Roads actions
+Year of Plenty:  playing a year of plenty for a pair in resource_pairs
+Monopoly:        playing a monopoly on a resource
+Maritime:        trading with the bank, giving the first resource of a
+                 pair in maritime_pairs at the player's ratio for one
+                 of the second
+
+Ids are int32 and legal actions are boolean masks of shape (N, size), so
+policies and search work on arrays rather than tables. Legal masks are
+found for a batch of GameStates at once. decode writes ids as rows of an
+ActionTable with the columns in action_columns, giving the change in
+cards where it is known, and encode reads such rows back into ids.
+"""
+
+
+import os
+import json
+from itertools import combinations_with_replacement
+
+import numpy as np
+
+from action_table import (
+    ActionTable,
+    column_indexes,
+    missing)
+from Board.compiled_board import get_compiled_board
+from Board.board_utils import get_legal_placements
+from Board.maritime import (
+    get_vertex_ratios,
+    get_trade_ratios,
+    bank_ratio)
+from snapshot import card_offsets
+from global_variables import (
+    path_resources,
+    resource_types,
+    card_types,
+    real_estates)
+
+
+section_names = [
+    "End Turn", "Settlements", "Cities", "Roads", "Robber", "Buy Development",
+    "Knight", "Road Builder", "Year of Plenty", "Monopoly", "Maritime"]
+
+piece_limits = {
+    "Settlements": 5,
+    "Cities": 4,
+    "Roads": 15}
+
+resource_pairs = np.array(list(
+    combinations_with_replacement(range(len(resource_types)), 2)))
+
+maritime_pairs = np.array([
+    (given, received)
+    for given in range(len(resource_types))
+    for received in range(len(resource_types))
+    if given != received])
+
+development_cards = {
+    "Knight": "Unplayed Knight",
+    "Road Builder": "Road Builder",
+    "Year of Plenty": "Year of Plenty",
+    "Monopoly": "Monopoly"}
+
+real_estate_columns = {
+    "Settlements": "Settlement",
+    "Cities": "City",
+    "Roads": "Road 1"}
+
+action_spaces = {}
+
+
+def load_costs():
+    with open(os.path.join(path_resources, "Costs.json"), "r") as file:
+        costs = json.load(file)
+    costs = {
+        purchase: np.array([
+            resources.get(resource, 0) for resource in resource_types])
+        for purchase, resources in costs.items()}
+    return costs
+
+def get_action_space():
+    compiled_board = get_compiled_board()
+    if compiled_board not in action_spaces:
+        action_spaces[compiled_board] = ActionSpace(
+            compiled_board.topology, compiled_board.ports_data)
+    return action_spaces[compiled_board]
+
+def get_hands(card_states, player_indexes):
+    """
+    Reads the cards held by each player from their own perspective,
+    giving an array of shape (N, 11) in the order of card_types.
+    """
+    own_states = card_states[np.arange(len(player_indexes)), player_indexes, 0]
+    hands = np.stack([
+        own_states[:, start:end].argmax(axis=1)
+        for start, end in zip(card_offsets[:-1], card_offsets[1:])], axis=1)
+    return hands
+
+# A city is built on top of a settlement, which goes back to the
+# player's supply.
+def get_pieces_used(real_estate, player_indexes):
+    games = np.arange(len(player_indexes))
+    pieces = {
+        real_estate_type: real_estate[real_estate_type][
+            games, player_indexes].sum(axis=1, dtype=int)
+        for real_estate_type in real_estates}
+    pieces["Settlements"] -= pieces["Cities"]
+    return pieces
+
+
+class ActionSpace():
+
+    def __init__(self, topology, ports_data):
+        self.topology = topology
+        self.costs = load_costs()
+        self.vertex_ratios = get_vertex_ratios(topology.vertex_count, ports_data)
+        self.set_sections()
+        self.set_lookups()
+
+    def set_sections(self):
+        self.sizes = {
+            "End Turn": 1,
+            "Settlements": self.topology.vertex_count,
+            "Cities": self.topology.vertex_count,
+            "Roads": self.topology.edge_count,
+            "Robber": self.topology.tile_count,
+            "Buy Development": 1,
+            "Knight": 1,
+            "Road Builder": 1,
+            "Year of Plenty": len(resource_pairs),
+            "Monopoly": len(resource_types),
+            "Maritime": len(maritime_pairs)}
+        self.offsets = np.cumsum(
+            [0] + [self.sizes[section] for section in section_names]).astype("int32")
+        self.size = int(self.offsets[-1])
+
+    # Resource pairs are looked up in either order.
+    def set_lookups(self):
+        resource_count = len(resource_types)
+        self.resource_pair_indexes = np.zeros((resource_count, resource_count), dtype="int32")
+        for index, (first, second) in enumerate(resource_pairs):
+            self.resource_pair_indexes[first, second] = index
+            self.resource_pair_indexes[second, first] = index
+        self.maritime_pair_indexes = np.zeros((resource_count, resource_count), dtype="int32")
+        self.maritime_pair_indexes[maritime_pairs[:, 0], maritime_pairs[:, 1]] = (
+            np.arange(len(maritime_pairs)))
+
+    def get_slice(self, section):
+        index = section_names.index(section)
+        return slice(self.offsets[index], self.offsets[index + 1])
+
+    def get_ids(self, section, indexes):
+        return (self.offsets[section_names.index(section)]
+                + np.asarray(indexes)).astype("int32")
+
+    def split_ids(self, ids):
+        """
+        Gives the index into section_names of the section of each id,
+        and the index of the action within its section.
+        """
+        ids = np.asarray(ids)
+        sections = np.searchsorted(self.offsets, ids, side="right") - 1
+        return sections, ids - self.offsets[sections]
+
+
+    # Masks
+
+    def get_masks(self, sections, count, end_turn=True):
+        """
+        Lays out boolean arrays of shape (N, section size) given for any
+        of the sections into masks of shape (N, size). Every other
+        section is illegal apart from ending the turn when end_turn is
+        True.
+        """
+        masks = np.zeros((count, self.size), dtype=bool)
+        masks[:, 0] = end_turn
+        for section, section_mask in sections.items():
+            masks[:, self.get_slice(section)] = section_mask
+        return masks
+
+    def get_legal_masks(self, state, player_indexes, resources=None,
+                        robber=False, played_development=None, sections=None):
+        """
+        Finds the legal actions of the player to move in each of a batch
+        of N GameStates, giving masks of shape (N, size).
+
+        resources:          (N, 5) resources of each player to move, read
+                            from their card state when not given
+        robber:             whether the player has to move the robber, in
+                            which case only Robber actions are legal
+        played_development: (N,) whether a development card has already
+                            been played this turn
+        sections:           the sections to consider, defaulting to all
+        """
+        player_indexes = np.asarray(player_indexes)
+        if robber:
+            return self.get_masks(self.get_robber_sections(state), len(player_indexes), False)
+        sections = section_names if sections is None else sections
+        hands = None
+        if resources is None or any(section in development_cards for section in sections):
+            hands = get_hands(state.card_states, player_indexes)
+        if resources is None:
+            resources = hands[:, :len(resource_types)]
+        section_masks = {}
+        if any(section in real_estates for section in sections):
+            section_masks |= self.get_building_sections(state, player_indexes, resources)
+        if any(section in development_cards or section == "Buy Development"
+               for section in sections):
+            section_masks |= self.get_development_sections(
+                state, hands, resources, played_development)
+        if "Maritime" in sections:
+            section_masks |= self.get_maritime_sections(state, player_indexes, resources)
+        section_masks = {
+            section: section_mask for section, section_mask in section_masks.items()
+            if section in sections}
+        return self.get_masks(section_masks, len(player_indexes))
+
+    def get_robber_sections(self, state):
+        tiles = np.ones((len(state), self.topology.tile_count), dtype=bool)
+        tiles[np.arange(len(state)), state.robber_index] = False
+        return {"Robber": tiles}
+
+    def get_building_sections(self, state, player_indexes, resources):
+        real_estate = state.get_real_estate()
+        placements = get_legal_placements(self.topology, real_estate, player_indexes)
+        pieces = get_pieces_used(real_estate, player_indexes)
+        sections = {}
+        for real_estate_type, placement in placements.items():
+            affordable = np.all(resources >= self.costs[real_estate_type], axis=1)
+            available = (pieces[real_estate_type] < piece_limits[real_estate_type])
+            sections[real_estate_type] = placement & (affordable & available)[:, np.newaxis]
+        return sections
+
+    # Playing development cards is only considered when the hands of the
+    # players have been read.
+    def get_development_sections(self, state, hands, resources, played_development):
+        affordable = np.all(resources >= self.costs["Development"], axis=1)
+        sections = {"Buy Development": (affordable & (state.data["Deck Size"] > 0))[:, np.newaxis]}
+        if hands is None:
+            return sections
+        can_play = np.ones(len(hands), dtype=bool)
+        if played_development is not None:
+            can_play = ~np.asarray(played_development)
+        for section, card_type in development_cards.items():
+            held = (hands[:, card_types.index(card_type)] > 0) & can_play
+            sections[section] = np.repeat(held[:, np.newaxis], self.sizes[section], axis=1)
+        return sections
+
+    def get_maritime_sections(self, state, player_indexes, resources):
+        games = np.arange(len(player_indexes))
+        ratios = get_trade_ratios(
+            self.vertex_ratios,
+            state.data["Settlements"][games, player_indexes],
+            state.data["Cities"][games, player_indexes])
+        can_give = (resources >= ratios)
+        return {"Maritime": can_give[:, maritime_pairs[:, 0]]}
+
+
+    # Converting to and from action tables
+
+    def decode(self, ids, ratios=None):
+        """
+        Writes each id as a row of an ActionTable. The ratios of shape
+        (N, 5) are used for the cards given in maritime trades and
+        default to the bank ratio.
+        """
+        ids = np.asarray(ids)
+        if ratios is None:
+            ratios = np.full((len(ids), len(resource_types)), bank_ratio)
+        table = ActionTable(max(len(ids), 1))
+        rows = table.add_rows(len(ids))
+        sections, indexes = self.split_ids(ids)
+        cards = table.get_group("Cards", rows)
+        cards[~np.isin(sections, [section_names.index("End Turn"),
+                                  section_names.index("Robber")])] = 0
+        for section_index, section in enumerate(section_names):
+            selected = (sections == section_index)
+            if np.any(selected):
+                self.decode_section(
+                    section, table, rows, cards, selected, indexes[selected], ratios[selected])
+        return table
+
+    def decode_section(self, section, table, rows, cards, selected, indexes, ratios):
+        resource_count = len(resource_types)
+        if section in real_estate_columns:
+            table.get_column(real_estate_columns[section], rows)[selected] = indexes
+            cards[selected, :resource_count] = -self.costs[section]
+        elif section == "Robber":
+            table.get_column("Robber", rows)[selected] = indexes
+        elif section == "Buy Development":
+            cards[selected, :resource_count] = -self.costs["Development"]
+        elif section in development_cards:
+            cards[selected, card_types.index(development_cards[section])] = -1
+            self.decode_development(section, table, rows, cards, selected, indexes)
+        elif section == "Maritime":
+            given, received = maritime_pairs[indexes].T
+            games = np.nonzero(selected)[0]
+            cards[games, given] = -ratios[np.arange(len(games)), given]
+            cards[games, received] = 1
+            table.get_column("Gained 1", rows)[selected] = received
+
+    def decode_development(self, section, table, rows, cards, selected, indexes):
+        games = np.nonzero(selected)[0]
+        match section:
+            case "Knight":
+                cards[games, card_types.index("Played Knight")] = 1
+            case "Year of Plenty":
+                first, second = resource_pairs[indexes].T
+                table.get_column("Gained 1", rows)[games] = first
+                table.get_column("Gained 2", rows)[games] = second
+                np.add.at(cards, (games, first), 1)
+                np.add.at(cards, (games, second), 1)
+            case "Monopoly":
+                table.get_column("Monopoly", rows)[games] = indexes
+
+    def encode(self, rows):
+        """
+        Reads rows of an ActionTable block back into ids. Rows that do
+        not describe an action in the action space are read as End Turn.
+        """
+        rows = np.asarray(rows)
+        columns = {column: rows[:, index] for column, index in column_indexes.items()}
+        cards = dict(zip(card_types, rows[:, :len(card_types)].T))
+        resources = rows[:, :len(resource_types)]
+        gained_1 = np.maximum(columns["Gained 1"], 0)
+        gained_2 = np.maximum(columns["Gained 2"], 0)
+        given = np.argmin(np.where(resources == missing, 0, resources), axis=1)
+        choices = [
+            (columns["Settlement"] != missing, "Settlements", columns["Settlement"]),
+            (columns["City"] != missing, "Cities", columns["City"]),
+            (columns["Road 1"] != missing, "Roads", columns["Road 1"]),
+            (cards["Played Knight"] == 1, "Knight", 0),
+            (columns["Robber"] != missing, "Robber", columns["Robber"]),
+            (cards["Road Builder"] == -1, "Road Builder", 0),
+            (cards["Year of Plenty"] == -1, "Year of Plenty",
+             self.resource_pair_indexes[gained_1, gained_2]),
+            (columns["Monopoly"] != missing, "Monopoly", columns["Monopoly"]),
+            (columns["Gained 1"] != missing, "Maritime",
+             self.maritime_pair_indexes[given, gained_1]),
+            (np.all(resources == -self.costs["Development"], axis=1),
+             "Buy Development", 0)]
+        ids = np.select(
+            [condition for condition, _, _ in choices],
+            [self.get_ids(section, indexes) for _, section, indexes in choices],
+            default=0)
+        return ids.astype("int32")
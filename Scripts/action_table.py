@@ -0,0 +1,105 @@
+"""
+A table of the actions considered in a trade cycle.
+
+The table is one int16 block with a column for each of action_columns,
+allocated ahead of time and doubled in size whenever it runs out of
+rows. Each group of columns in column_groups is contiguous, so a group
+is read and written through a view of the block without copying.
+Columns an action does not use hold missing, and players are stored by
+their index in the game.
+
+pandas is only imported to show the table to people.
+"""
+
+
+import numpy as np
+
+from global_variables import (
+    card_types,
+    action_columns)
+
+
+missing = np.iinfo(np.int16).min
+
+column_groups = {
+    "Cards": card_types,
+    "Partner": ["Trade Partner"],
+    "Real Estate": ["Settlement", "City", "Road 1", "Road 2"],
+    "Robber": ["Robber", "Robbee", "Robbed Tile"],
+    "Dumped": ["Dumped 1", "Dumped 2", "Dumped 3", "Dumped 4"],
+    "Gained": ["Gained 1", "Gained 2"],
+    "Development": ["Monopoly"]}
+
+# Monopoly is both a card type and the resource chosen when playing
+# one. Columns are looked up by their last occurrence, so the Monopoly
+# column is the resource chosen and the card is read from Cards.
+column_indexes = {column: index for index, column in enumerate(action_columns)}
+
+group_slices = {
+    group: slice(column_indexes[columns[0]], column_indexes[columns[-1]] + 1)
+    for group, columns in column_groups.items()}
+
+player_columns = ["Trade Partner", "Robbee"]
+
+
+class ActionTable():
+
+    def __init__(self, capacity=64):
+        self.block = np.full((capacity, len(action_columns)), missing, dtype="int16")
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def rows(self):
+        return self.block[:self.count]
+
+    def add_rows(self, count):
+        """
+        Adds count rows with every column missing and returns a view of
+        them to be filled in.
+        """
+        self.reserve(count)
+        start = self.count
+        self.count += count
+        return self.block[start:self.count]
+
+    def reserve(self, count):
+        capacity = len(self.block)
+        if self.count + count > capacity:
+            while self.count + count > capacity:
+                capacity *= 2
+            block = np.full((capacity, len(action_columns)), missing, dtype="int16")
+            block[:self.count] = self.rows
+            self.block = block
+
+
+    # Views
+
+    def get_column(self, column, rows=None):
+        rows = self.rows if rows is None else rows
+        return rows[:, column_indexes[column]]
+
+    def get_group(self, group, rows=None):
+        rows = self.rows if rows is None else rows
+        return rows[:, group_slices[group]]
+
+    @property
+    def cards(self):
+        return self.get_group("Cards")
+
+
+    # Reading by people
+
+    def to_dataframe(self, player_names=None):
+        import pandas as pd
+        actions = pd.DataFrame(self.rows, columns=action_columns).astype(float)
+        actions[actions == missing] = np.nan
+        if player_names is not None:
+            for column in player_columns:
+                actions[column] = actions[column].map(dict(enumerate(player_names)))
+        return actions
+
+    def to_string(self, player_names=None):
+        return self.to_dataframe(player_names).to_string()
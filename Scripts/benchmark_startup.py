@@ -0,0 +1,67 @@
+"""
+Measures how long a new process takes to import the game.
+
+    python benchmark_startup.py --repeats 10
+
+Each repeat imports the module in a new interpreter, as a worker process
+would, and reports the time taken along with any of the plotting,
+reporting, and model libraries that were imported. None of these should
+be imported by the game until they are used.
+"""
+
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+import numpy as np
+
+
+heavy_modules = ["matplotlib", "pandas", "hgutilities", "keras"]
+
+measure_import = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+duration = time.perf_counter() - start
+imported = [name for name in {heavy_modules} if name in sys.modules]
+print(json.dumps({{"Duration": duration, "Imported": imported}}))
+"""
+
+
+def measure_startup(module, repeats):
+    command = measure_import.format(module=module, heavy_modules=heavy_modules)
+    results = [run_measurement(command) for _ in range(repeats)]
+    durations = np.array([result["Duration"] for result in results])
+    return durations, results[-1]["Imported"]
+
+# The result is the last line printed so that anything printed on import
+# is ignored.
+def run_measurement(command):
+    process = subprocess.run(
+        [sys.executable, "-c", command], capture_output=True, text=True,
+        check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(process.stdout.splitlines()[-1])
+
+def print_startup(module, durations, imported):
+    print(f"import {module}: "
+          f"median {np.median(durations)*1000:.0f} ms, "
+          f"minimum {durations.min()*1000:.0f} ms "
+          f"over {durations.size} processes")
+    print(f"Heavy modules imported: {', '.join(imported) or 'none'}")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Measure the import time of the game in new processes")
+    parser.add_argument("--module", default="game")
+    parser.add_argument("--repeats", type=int, default=10)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    durations, imported = measure_startup(arguments.module, arguments.repeats)
+    print_startup(arguments.module, durations, imported)
@@ -4,7 +4,9 @@ from hgutilities.utils import json
 import numpy as np
 import pandas as pd
 
-from game import Game
+from game import Game, splash
+
+print(splash)
 
 np.set_printoptions(edgeitems=30, linewidth=10000)
 
@@ -0,0 +1,136 @@
+"""
+Renders every recorded move of a saved game.
+
+    python export_replay.py TestGame --format pdf --workers 8
+
+Frames are rendered in a pool of processes using the Agg backend. Each
+worker draws the layout once and then only updates the real estate for
+each move. Frames are returned in move order as PNG data and written as
+they arrive, so a PNG sequence or a multi-page PDF is streamed to disk
+without keeping the frames in memory. Pillow has to keep every frame of
+a GIF until the file is written, so those are kept as paletted images.
+"""
+
+
+import os
+import io
+import argparse
+from multiprocessing import Pool
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from PIL import Image
+
+from game import Game
+from history import (
+    load_history,
+    get_board_state)
+
+
+# Set separately in each worker process by init_worker
+worker = {}
+
+
+def init_worker(name, header, dpi):
+    game = Game(name, reset_log=False)
+    game.board.load_layout_from_arrays(
+        header["Tile Types"], header["Tile Numbers"], header["Layout"])
+    worker["Game"] = game
+    worker["Header"] = header
+    worker["Renderer"] = game.board.get_renderer()
+    worker["DPI"] = dpi
+
+def render_frame(entry):
+    board_state = get_board_state(
+        worker["Header"], entry, worker["Game"].board.topology)
+    worker["Renderer"].update(*board_state)
+    buffer = io.BytesIO()
+    worker["Renderer"].fig.savefig(buffer, format="png", dpi=worker["DPI"])
+    return buffer.getvalue()
+
+
+def export_replay(name, output_format="pdf", workers=None, dpi=100, path=None):
+    game = Game(name, reset_log=False)
+    header, entries = load_history(game.path_history)
+    path = get_output_path(game, output_format, path)
+    game.log.info(f"Rendering {len(entries)} moves to {path}")
+    with Pool(workers, initializer=init_worker, initargs=(name, header, dpi)) as pool:
+        frames = pool.imap(render_frame, entries, chunksize=4)
+        write_frames(frames, entries, output_format, path)
+    game.log.info(f"Exported replay to {path}")
+    return path
+
+def get_output_path(game, output_format, path):
+    if path is None:
+        if output_format == "png":
+            path = os.path.join(game.path, "Replay")
+        else:
+            path = os.path.join(game.path, f"Replay.{output_format}")
+    return path
+
+def write_frames(frames, entries, output_format, path):
+    match output_format:
+        case "png": write_png_sequence(frames, entries, path)
+        case "pdf": write_pdf(frames, path)
+        case "gif": write_gif(frames, path)
+        case _: raise ValueError(f"Unknown replay format {output_format}")
+
+def write_png_sequence(frames, entries, path):
+    os.makedirs(path, exist_ok=True)
+    for frame, entry in zip(frames, entries):
+        frame_path = os.path.join(path, f"Move_{entry['Move']:04}.png")
+        with open(frame_path, "wb") as file:
+            file.write(frame)
+
+# Each page shows a frame on a single image that is updated in place.
+def write_pdf(frames, path):
+    with PdfPages(path) as pdf:
+        image = None
+        for frame in frames:
+            pixels = matplotlib.image.imread(io.BytesIO(frame))
+            if image is None:
+                fig, image = get_pdf_page(pixels)
+            image.set_data(pixels)
+            pdf.savefig(fig)
+
+def get_pdf_page(pixels):
+    height, width = pixels.shape[:2]
+    fig = Figure(figsize=(width / 100, height / 100), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.axis("off")
+    image = ax.imshow(pixels)
+    return fig, image
+
+def write_gif(frames, path, duration=500):
+    images = (
+        Image.open(io.BytesIO(frame)).convert("P", palette=Image.Palette.ADAPTIVE)
+        for frame in frames)
+    first_image = next(images)
+    first_image.save(
+        path, save_all=True, append_images=images,
+        duration=duration, loop=0)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Render every recorded move of a saved game")
+    parser.add_argument("name", help="name of the game in Data/Games")
+    parser.add_argument("--format", dest="output_format", default="pdf",
+                        choices=["pdf", "png", "gif"])
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes, defaults to the number of cores")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--path", default=None,
+                        help="output file, or folder for png")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    export_replay(
+        arguments.name, arguments.output_format,
+        arguments.workers, arguments.dpi, arguments.path)
@@ -1,24 +1,40 @@
 import logging
 import os
-from random import shuffle
+import json
 
-import pandas as pd
 import numpy as np
-from hgutilities import defaults
-from hgutilities.utils import get_dict_string, make_folder, json
 
 from Board.board import Board
+from Board.longest_road import LongestRoad
+from Board.production import Production
+from Board.maritime import Maritime
 from Players.player_regular import PlayerRegular
 from turn import Turn
+from history import (
+    record_history,
+    reset_history)
+from log_utils import (
+    LazyMessage,
+    set_level_from_handlers,
+    silence,
+    silent_default)
+from journal import Journal
+from game_state import GameState
+from random_streams import RandomStreams
+from snapshot import (
+    save_snapshot,
+    load_snapshot)
 from utils import (
     get_name,
-    get_change_str)
-from output_state import plot_card_state
+    get_change_str,
+    dump_json,
+    get_json_string)
 from global_variables import (
     path_data,
     path_resources,
     path_layouts,
-    real_estate_graph_components)
+    real_estate_graph_components,
+    resource_types)
 
 
 formatter = logging.Formatter(
@@ -26,6 +42,8 @@ formatter = logging.Formatter(
     style="{",
     datefmt="%Y-%m-%d %H:%M")
 
+# Printed by catan.py rather than on import so that worker processes
+# importing the game stay silent.
 splash = r"""
       ______     _____    ____________   _____        ____    ___
      /  ___/    /     |  /____   ____/  /     |      /    |  /  /
@@ -35,18 +53,26 @@ splash = r"""
   \  \___   /  /   |  |   /  /      /  /   |  |  /  /   |   /
    \_____/ /__/    |__|  /__/      /__/    |__| /__/    |__/
 """
-print(splash)
 
 
 class Game():
 
     # Logging, paths, and initialisation
 
-    def __init__(self, name=None, reset_log=True, seed=None):
+    def __init__(self, name=None, reset_log=True, seed=None, bitboard=True,
+                 silent=None, save_files=True):
+        """
+        A game with save_files set to False does not create its folder
+        or write its history and journal, which is meant for simulation
+        workers. Calling save still writes the game.
+        """
         self.name = name
+        self.bitboard = bitboard
+        self.save_files = save_files
         self.set_paths()
-        self.create_folders()
-        self.init_log(reset_log)
+        if self.save_files:
+            self.create_folders()
+        self.init_log(reset_log, silent)
         self.set_seed(seed)
         self.create_objects()
     
@@ -57,20 +83,34 @@ class Game():
         self.path_logger = os.path.join(
             self.path, f"{self.name}.log")
         self.path_state = os.path.join(
+            self.path, f"{self.name}State.npz")
+        self.path_state_json = os.path.join(
             self.path, f"{self.name}State.json")
+        self.path_history = os.path.join(
+            self.path, f"{self.name}History.jsonl")
 
     def create_folders(self):
-        make_folder(path_layouts)
-        make_folder(self.path)
+        os.makedirs(path_layouts, exist_ok=True)
+        os.makedirs(self.path, exist_ok=True)
 
-    def init_log(self, reset_log):
-        file_handler_mode = self.get_file_handler_mode(reset_log)
+    def init_log(self, reset_log, silent):
         self.log = logging.getLogger(self.name)
-        self.log.setLevel(logging.DEBUG)
+        self.log.handlers.clear()
+        if silent is None:
+            silent = silent_default
+        if silent:
+            silence(self.log)
+        else:
+            self.add_handlers(reset_log)
+
+    def add_handlers(self, reset_log):
+        file_handler_mode = self.get_file_handler_mode(reset_log)
+        self.log.disabled = False
         self.add_console_handler()
         #self.add_file_handler(file_handler_mode)
+        set_level_from_handlers(self.log)
         self.log.debug(splash)
-        self.log.debug(f"Initialised {self.name}")
+        self.log.debug("Initialised %s", self.name)
 
     def get_file_handler_mode(self, reset_log):
         if reset_log is True:
@@ -91,15 +131,17 @@ class Game():
         file_handler.setLevel(logging.DEBUG)
         self.log.addHandler(file_handler)
 
+    # The game draws all of its random numbers from its own streams
+    # rather than the global NumPy generator.
     def set_seed(self, seed):
         if seed is None:
-            self.seed = np.random.randint(1, 10**6)
-            self.log.debug("Numpy randomisation seed not set, generating random seed")
+            self.seed = int(np.random.default_rng().integers(1, 10**6))
+            self.log.debug("Randomisation seed not set, generating random seed")
         else:
             self.seed = seed
-            self.log.debug("Numpy randomisation seed prescribed")
-        np.random.seed(self.seed)
-        self.log.debug(f"Numpy randomisation seed: {np.random.seed}")
+            self.log.debug("Randomisation seed prescribed")
+        self.random = RandomStreams(self.seed)
+        self.log.debug("Randomisation seed: %s", self.seed)
 
     def create_objects(self):
         self.log.info("Creating board")
@@ -110,11 +152,17 @@ class Game():
     # Saving and loading
 
     def save(self):
-        game_state = self.get_game_state()
-        with open(self.path_state, "w+") as file:
-            json.dump(game_state, file, indent=2)
+        self.create_folders()
+        save_snapshot(self, self.path_state)
+        self.record_history()
+        self.journal.flush()
         self.log.info(f"Saved game at {self.path_state}")
-        self.log.debug(json.dumps(self.path_state))
+
+    def export_json(self):
+        game_state = self.get_game_state()
+        with open(self.path_state_json, "w+") as file:
+            dump_json(game_state, file)
+        self.log.info(f"Exported game state to {self.path_state_json}")
 
     def get_game_state(self):
         meta_data = self.get_meta_data()
@@ -130,34 +178,83 @@ class Game():
             for player in self.players}
         return players_state
 
+    # The layout is kept as its arrays so that saves and checkpoints of
+    # a layout that was never saved can still be loaded.
     def get_meta_data(self):
+        tile_types, tile_numbers = self.board.get_layout_arrays()
         meta_data = {
             "Layout": self.board.layout_name,
+            "Layout Store": self.board.layout_store,
+            "Tile Types": tile_types.tolist(),
+            "Tile Numbers": tile_numbers.tolist(),
             "Colors": {player.name: player.color
                        for player in self.players},
             "Development Card Deck": self.development_deck,
             "Move": self.move,
-            "Robber": self.robber_index}
+            "Robber": self.robber_index,
+            "Seed": self.seed,
+            "Dice Rolled": self.random.dice.rolled,
+            "Random States": self.random.get_states()}
         return meta_data
 
+    # Games saved before snapshots were added only have a JSON state.
     def load(self):
+        if os.path.exists(self.path_state):
+            self.load_from_snapshot()
+        else:
+            self.load_from_json()
+        self.initialise_longest_road()
+        self.initialise_production()
+        self.initialise_maritime()
+        self.initialise_journal(reset=False)
+
+    def load_from_snapshot(self, path=None):
+        if path is None:
+            path = self.path_state
+        meta_data, real_estate, card_states = load_snapshot(path)
+        self.load_meta_data({"MetaData": meta_data})
+        self.state.set_real_estate(real_estate)
+        self.state.card_states[...] = card_states
+        self.attach_state()
+        self.log.info(f"Loaded state from {path}")
+
+    def load_from_json(self):
         game_state = self.load_game_state()
         self.load_meta_data(game_state)
         self.load_player_states_from_game_state(game_state)
-        self.log.info(f"Loaded state from {self.path_state}")
-        self.log.debug(json.dumps(game_state))
+        self.log.info(f"Loaded state from {self.path_state_json}")
+        self.log.debug("%s", LazyMessage(get_json_string, game_state))
 
     def load_meta_data(self, game_state):
-        self.board.load_layout(game_state["MetaData"]["Layout"])
+        self.load_layout_from_meta_data(game_state["MetaData"])
         names, colors = list(zip(*game_state["MetaData"]["Colors"].items()))
         self.initialise_players(names=names, colors=colors)
         self.development_deck = (
             game_state["MetaData"]["Development Card Deck"])
         self.move = game_state["MetaData"]["Move"]
-        self.robber_index = game_state["MetaData"]["Robber"]
+        self.set_robber(game_state["MetaData"]["Robber"])
+        self.load_random_state(game_state["MetaData"])
+
+    # Games saved before the layout arrays were recorded load the layout
+    # by its name.
+    def load_layout_from_meta_data(self, meta_data):
+        if "Tile Types" in meta_data:
+            self.board.load_layout_from_arrays(
+                meta_data["Tile Types"], meta_data["Tile Numbers"],
+                meta_data["Layout"], meta_data.get("Layout Store"))
+        else:
+            self.board.load_layout(meta_data["Layout"], meta_data.get("Layout Store"))
+
+    # Games saved before the seed was recorded keep the seed they were
+    # created with.
+    def load_random_state(self, meta_data):
+        if "Seed" in meta_data:
+            self.set_seed(meta_data["Seed"])
+            self.random.dice.skip(meta_data["Dice Rolled"])
+            self.random.set_states(meta_data.get("Random States", {}))
 
     def load_game_state(self):
-        with open(self.path_state, "r") as file:
+        with open(self.path_state_json, "r") as file:
             game_state = json.load(file)
         return game_state
 
@@ -170,8 +267,13 @@ class Game():
     def start_game(self, names=None, colors=None):
         self.initialise_players(names, colors)
         self.set_initial_states()
+        self.initialise_longest_road()
         self.initialise_robber()
+        self.initialise_production()
+        self.initialise_maritime()
         self.move = 0
+        self.reset_history()
+        self.initialise_journal(reset=True)
 
     def initialise_players(self, names, colors):
         names = self.get_player_names(names)
@@ -179,7 +281,57 @@ class Game():
         self.players = [
             PlayerRegular(self, name, color)
             for name, color in zip(names, colors)]
+        self.state = GameState.empty(self.board.topology, len(self.players))
         self.initialise_perspectives()
+        self.attach_state()
+
+    # Players and perspectives hold views into the game state, so
+    # changing their arrays in place changes the state.
+    def attach_state(self):
+        for player_index, player in enumerate(self.players):
+            player.set_from_arrays(
+                self.state.get_real_estate(player_index),
+                self.state.card_states[player_index])
+
+    def clone_state(self):
+        return self.state.clone()
+
+    def set_state(self, state):
+        """
+        Copies a state given by clone_state into the game. The arrays
+        derived from the state are then rebuilt.
+        """
+        self.state.data[...] = state.data
+        for player in self.players:
+            player.set_real_estate_masks()
+        self.set_robber(self.robber_index)
+        self.initialise_longest_road()
+        self.initialise_production()
+        self.initialise_maritime()
+
+    @property
+    def move(self):
+        return int(self.state.move)
+
+    @move.setter
+    def move(self, move):
+        self.state.data["Move"] = move
+
+    @property
+    def robber_index(self):
+        return int(self.state.robber_index)
+
+    @robber_index.setter
+    def robber_index(self, robber_index):
+        self.state.data["Robber"] = robber_index
+
+    @property
+    def development_deck(self):
+        return self.state.get_deck()
+
+    @development_deck.setter
+    def development_deck(self, development_deck):
+        self.state.set_deck(development_deck)
 
     def initialise_perspectives(self):
         for player in self.players:
@@ -201,7 +353,7 @@ class Game():
         colors = self.get_player_colors(colors)
         for player, color in zip(self.players, colors):
             player.color = color
-            self.log.debug(f"Setting color for {player.name} to {color}")
+            self.log.debug("Setting color for %s to %s", player.name, color)
 
     def set_initial_states(self):
         self.initialise_development_deck()
@@ -213,9 +365,13 @@ class Game():
         development_path = os.path.join(
             path_resources, "Development Deck.json")
         with open(development_path, "r") as file:
-            self.development_deck = json.load(file)
-        shuffle(self.development_deck)
-        self.log.debug(f"Initialising development deck:\n{self.development_deck}")
+            development_deck = json.load(file)
+        order = self.random.deck.permutation(len(development_deck))
+        self.development_deck = [development_deck[index] for index in order]
+        self.log.debug("Initialising development deck:\n%s", self.development_deck)
+
+    def initialise_longest_road(self):
+        self.longest_road = LongestRoad(self)
 
     def get_player(self, player_name):
         player = [
@@ -223,18 +379,42 @@ class Game():
             if player.name == player_name][0]
         return player
 
+    def initialise_production(self):
+        self.production = Production(self)
+
+    def initialise_maritime(self):
+        self.maritime = Maritime(self)
+
+    # A checkpoint is saved at the start of the journal so every
+    # position recorded in it can be rebuilt.
+    def initialise_journal(self, reset):
+        self.journal = Journal(self, reset=(reset and self.save_files))
+        if not self.save_files:
+            self.journal.recording = False
+        elif self.journal.event_count == 0 or reset:
+            self.journal.save_checkpoint()
+
+    def load_move(self, move):
+        self.journal.load_move(move)
+        self.log.info(f"Loaded position at the end of move {move}")
+
     def initialise_robber(self):
         robber_index = [
             index
-            for index, tile in self.board.tiles
+            for index, tile in enumerate(self.board.tiles)
             if tile.type == "Desert"][0]
-        self.update_robber(robber_index)
+        self.set_robber(robber_index)
 
     def update_robber(self, index):
+        self.production.move_robber(self.robber_index, index)
+        self.set_robber(index)
+        self.journal.record_robber(index)
+
+    def set_robber(self, index):
         self.log.info(f"Robber placed on tile {index}")
-        self.robber_index = index
+        self.robber_index = int(index)
         self.robber_state = np.zeros(19).astype("int8")
-        self.robber_state[robber_index] = 1
+        self.robber_state[index] = 1
 
 
     # Game control
@@ -248,9 +428,22 @@ class Game():
     def generate_layout(self, *args, **kwargs):
         self.board.generate_layout(*args, **kwargs)
 
+    def record_history(self):
+        if self.save_files:
+            record_history(self)
+
+    def reset_history(self):
+        if self.save_files:
+            reset_history(self)
+
+    # The dice are rolled before the move is recorded so that every
+    # checkpoint includes the roll of each move it has started.
     def next_turn(self):
+        self.record_history()
         self.turn = Turn(self)
-        self.turn.execute_dice_roll()
+        self.turn.set_dice_result()
+        self.journal.record_move()
+        self.turn.distribute_resources_tiles()
 
     def take_turn(self):
         self.turn.take_turn()
@@ -287,7 +480,9 @@ class Game():
         self.buy_road_from_index(player, edge_index)
 
     def buy_road_from_index(self, player, edge_index):
-        player.real_estate["Roads"][edge_index] = 1
+        player.add_real_estate("Roads", edge_index)
+        self.longest_road.add_road(player, edge_index)
+        self.journal.record_road(player, edge_index)
 
     def buy_settlement(self, player_name, *args):
         """
@@ -330,7 +525,11 @@ class Game():
         self.buy_vertex_from_index(player, vertex_type, vertex_index)
 
     def buy_vertex_from_index(self, player, vertex_type, vertex_index):
-        player.real_estate[vertex_type][vertex_index] = 1
+        player.add_real_estate(vertex_type, vertex_index)
+        self.longest_road.add_vertex(player, vertex_index)
+        self.production.add_vertex(player, vertex_type, vertex_index)
+        self.maritime.add_vertex(player, vertex_index)
+        self.journal.record_vertex(player, vertex_type, vertex_index)
 
     def play_development(self, trade):
         self.turn.play_development_input(trade)
@@ -340,16 +539,38 @@ class Game():
 
     def update_state(self, card_type, actor_changes):
         self.log_update_state(card_type, actor_changes)
-        for player in self.players:
-            for actor, change in actor_changes.items():
+        for actor, change in actor_changes.items():
+            for player in self.players:
                 self.update_state_perspectives(
                     card_type, player, actor, change)
+            self.journal.record_card(card_type, actor, change)
+
+    # These are views into the game state and should not be changed.
+    def get_real_estate(self):
+        return self.state.get_real_estate()
+
+    def get_position_hash(self):
+        tile_types, tile_numbers = self.board.get_layout_arrays()
+        position_hash = self.board.symmetry.get_hash(
+            tile_types, tile_numbers, self.get_real_estate())
+        return position_hash
+
+    def update_state_resources(self, resources_gained):
+        for resource_index, resource in enumerate(resource_types):
+            actor_changes = {
+                player: change
+                for player, change in zip(
+                    self.players, resources_gained[:, resource_index])
+                if change != 0}
+            if len(actor_changes) > 0:
+                self.update_state(resource, actor_changes)
 
     def log_update_state(self, card_type, actor_changes):
-        changes = {
-            player.name: change
-            for player, change in actor_changes.items()}
-        self.log.debug(f"Updating {card_type} state for:\n{changes}")
+        if self.log.isEnabledFor(logging.DEBUG):
+            changes = {
+                player.name: change
+                for player, change in actor_changes.items()}
+            self.log.debug("Updating %s state for:\n%s", card_type, changes)
 
     def update_state_perspectives(self, card_type, player, actor, change):
         for perspective in player.perspectives:
@@ -372,6 +593,7 @@ class Game():
         self.board.show_board()
 
     def get_card_df(self):
+        import pandas as pd
         player_dfs = [player.get_card_df() for player in self.players]
         card_df = pd.concat(player_dfs, axis=1)
         return card_df
@@ -379,6 +601,7 @@ class Game():
     def plot_card_state(self, player_name, perspective_name):
         player = self.get_player(player_name)
         perspective = player.get_perspective(perspective_name)
+        from output_state import plot_card_state
         plot_card_state(perspective)
 
     def __str__(self):
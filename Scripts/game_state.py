@@ -0,0 +1,118 @@
+"""
+The whole state of a game in one contiguous buffer.
+
+A GameState wraps a NumPy structured array whose fields sit at fixed
+offsets in a single block of memory.
+
+Move:        the number of the current move
+Robber:      the index of the tile the robber is on
+Deck Size:   the number of development cards left in the deck
+Deck:        the deck as codes into development_types, padded with -1
+Settlements: (players, vertices) int8 indicators
+Cities:      (players, vertices) int8 indicators
+Roads:       (players, edges) int8 indicators
+Card States: (players, perspectives, 132) card state of each perspective
+             with the card types joined end to end as in snapshot
+
+The Game reads and writes through views of these fields, so copying the
+buffer copies the whole position. The buffer can have leading batch
+axes, in which case every field gains the same axes, and fork makes a
+batch of copies of one position for search.
+"""
+
+
+import numpy as np
+
+from snapshot import (
+    card_offsets,
+    get_flat_card_state)
+from global_variables import (
+    real_estates,
+    initial_state)
+
+
+development_types = ["Knight", "Victory", "Road Builder", "Year of Plenty", "Monopoly"]
+
+state_dtypes = {}
+
+
+def get_state_dtype(topology, player_count, deck_size):
+    key = (topology.vertex_count, topology.edge_count, player_count, deck_size)
+    if key not in state_dtypes:
+        state_dtypes[key] = np.dtype([
+            ("Move", "<i4"),
+            ("Robber", "i1"),
+            ("Deck Size", "i1"),
+            ("Deck", "i1", (deck_size,)),
+            ("Settlements", "i1", (player_count, topology.vertex_count)),
+            ("Cities", "i1", (player_count, topology.vertex_count)),
+            ("Roads", "i1", (player_count, topology.edge_count)),
+            ("Card States", "<f8", (player_count, player_count, card_offsets[-1]))],
+            align=True)
+    return state_dtypes[key]
+
+
+class GameState():
+
+    def __init__(self, data):
+        self.data = data
+
+    @classmethod
+    def empty(cls, topology, player_count=4, deck_size=25):
+        data = np.zeros((), dtype=get_state_dtype(topology, player_count, deck_size))
+        data["Deck"] = -1
+        data["Card States"] = get_flat_card_state(initial_state)
+        return cls(data)
+
+    def clone(self):
+        return GameState(self.data.copy())
+
+    def fork(self, count):
+        return GameState(np.repeat(self.data[np.newaxis], count, axis=0))
+
+    def __getitem__(self, index):
+        return GameState(self.data[index])
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+
+    # Fields
+
+    @property
+    def move(self):
+        return self.data["Move"]
+
+    @property
+    def robber_index(self):
+        return self.data["Robber"]
+
+    @property
+    def card_states(self):
+        return self.data["Card States"]
+
+    def get_real_estate(self, player_index=None):
+        if player_index is None:
+            return {
+                real_estate_type: self.data[real_estate_type]
+                for real_estate_type in real_estates}
+        return {
+            real_estate_type: self.data[real_estate_type][..., player_index, :]
+            for real_estate_type in real_estates}
+
+    def set_real_estate(self, real_estate):
+        for real_estate_type in real_estates:
+            self.data[real_estate_type] = real_estate[real_estate_type]
+
+    def get_deck(self):
+        deck_codes = self.data["Deck"][:self.data["Deck Size"]]
+        return [development_types[code] for code in deck_codes.tolist()]
+
+    def set_deck(self, deck):
+        self.data["Deck"] = -1
+        self.data["Deck"][:len(deck)] = [development_types.index(card) for card in deck]
+        self.data["Deck Size"] = len(deck)
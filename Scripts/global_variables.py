@@ -7,6 +7,7 @@ path_base = os.path.dirname(os.path.dirname(__file__))
 path_data = os.path.join(path_base, "Data")
 path_resources = os.path.join(path_data, "Resources")
 path_layouts = os.path.join(path_data, "Layouts")
+path_tournaments = os.path.join(path_data, "Tournaments")
 
 real_estates = ["Settlements", "Cities", "Roads"]
 
@@ -0,0 +1,76 @@
+"""
+The board history of a game, saved as one line per recorded move.
+
+The first line is a header with the tile types and numbers of the
+layout and the player colors, so a replay does not depend on the layout
+having been saved under a name. Every following line records the move number, robber position, and the
+indexes of each player's settlements, cities, and roads. Lines are only
+ever appended, so recording a move does not rewrite the file.
+"""
+
+
+import os
+import json
+
+import numpy as np
+
+from global_variables import (
+    real_estates,
+    real_estate_graph_components)
+
+
+def record_history(game):
+    if not os.path.exists(game.path_history):
+        write_history_line(game.path_history, get_history_header(game))
+    write_history_line(game.path_history, get_history_entry(game))
+
+# A new game under the name of an old one starts its own history.
+def reset_history(game):
+    if os.path.exists(game.path_history):
+        os.remove(game.path_history)
+
+def write_history_line(path, line):
+    with open(path, "a") as file:
+        file.write(json.dumps(line) + "\n")
+
+def get_history_header(game):
+    tile_types, tile_numbers = game.board.get_layout_arrays()
+    header = {
+        "Layout": game.board.layout_name,
+        "Tile Types": tile_types.tolist(),
+        "Tile Numbers": tile_numbers.tolist(),
+        "Colors": [player.color for player in game.players]}
+    return header
+
+def get_history_entry(game):
+    entry = {
+        "Move": game.move,
+        "Robber": game.robber_index,
+        "Real Estate": {
+            real_estate: [
+                np.nonzero(player.real_estate[real_estate])[0].tolist()
+                for player in game.players]
+            for real_estate in real_estates}}
+    return entry
+
+def load_history(path):
+    with open(path, "r") as file:
+        lines = [json.loads(line) for line in file]
+    header, entries = lines[0], get_latest_entries(lines[1:])
+    return header, entries
+
+# A move can be recorded more than once, for example when a game is
+# saved part way through a move, and only the latest record is kept.
+def get_latest_entries(entries):
+    latest_entries = {entry["Move"]: entry for entry in entries}
+    return [latest_entries[move] for move in sorted(latest_entries)]
+
+def get_board_state(header, entry, topology):
+    sizes = {"Vertex": topology.vertex_count, "Edge": topology.edge_count}
+    real_estate = {}
+    for real_estate_type, indexes in entry["Real Estate"].items():
+        size = sizes[real_estate_graph_components[real_estate_type]]
+        real_estate[real_estate_type] = np.zeros((len(indexes), size), dtype="int8")
+        for player_index, player_indexes in enumerate(indexes):
+            real_estate[real_estate_type][player_index, player_indexes] = 1
+    return real_estate, header["Colors"], entry["Robber"]
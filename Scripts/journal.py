@@ -0,0 +1,168 @@
+"""
+An append-only journal of every change made to a game.
+
+Each event is a fixed width binary record of 8 bytes giving the move it
+happened in, the kind of event, the player, a type code, an index, and a
+change. The codes index into the lists below, and fields an event does
+not use are 0.
+
+Move:   a new move was started and its dice were rolled
+Road:   player bought the road on edge index
+Vertex: player bought real estate of the type code on vertex index
+Robber: the robber was moved onto tile index
+Card:   the card state of the type code changed by change for player
+
+Events are recorded after the change is made, and every
+checkpoint_interval events a snapshot of the game is written as a
+checkpoint, named by the number of events it includes. The position at
+the end of any move is rebuilt by loading the last checkpoint before it
+and replaying at most checkpoint_interval events through the same Game
+methods that recorded them. Each Move event replayed moves the dice on
+by one roll, so rolls made after loading carry on from the target move.
+"""
+
+
+import os
+
+import numpy as np
+
+from snapshot import save_snapshot
+from global_variables import (
+    real_estates,
+    card_types)
+
+
+event_kinds = ["Move", "Road", "Vertex", "Robber", "Card"]
+
+event_dtype = np.dtype([
+    ("Move", "<u2"),
+    ("Kind", "u1"),
+    ("Player", "i1"),
+    ("Type", "u1"),
+    ("Index", "u1"),
+    ("Change", "i1"),
+    ("Padding", "u1")])
+
+
+class Journal():
+
+    checkpoint_interval = 64
+
+    def __init__(self, game, reset=False):
+        self.game = game
+        self.path_events = os.path.join(game.path, f"{game.name}Journal.events")
+        self.path_checkpoints = os.path.join(game.path, "Checkpoints")
+        self.recording = True
+        self.pending = []
+        if reset:
+            self.reset()
+        self.event_count = self.get_saved_event_count()
+
+    def reset(self):
+        if os.path.exists(self.path_events):
+            os.remove(self.path_events)
+        if os.path.exists(self.path_checkpoints):
+            for file_name in os.listdir(self.path_checkpoints):
+                os.remove(os.path.join(self.path_checkpoints, file_name))
+
+    def get_saved_event_count(self):
+        if not os.path.exists(self.path_events):
+            return 0
+        return os.path.getsize(self.path_events) // event_dtype.itemsize
+
+
+    # Recording
+
+    def record_move(self):
+        self.record("Move")
+
+    def record_road(self, player, edge_index):
+        self.record("Road", player, index=edge_index)
+
+    def record_vertex(self, player, vertex_type, vertex_index):
+        self.record("Vertex", player, real_estates.index(vertex_type), vertex_index)
+
+    def record_robber(self, tile_index):
+        self.record("Robber", index=tile_index)
+
+    def record_card(self, card_type, player, change):
+        self.record("Card", player, card_types.index(card_type), change=change)
+
+    def record(self, kind, player=None, type_code=0, index=0, change=0):
+        if not self.recording:
+            return
+        player_index = -1 if player is None else self.game.players.index(player)
+        self.pending.append((
+            self.game.move, event_kinds.index(kind), player_index,
+            type_code, index, change, 0))
+        self.event_count += 1
+        if self.event_count % self.checkpoint_interval == 0:
+            self.save_checkpoint()
+
+    def flush(self):
+        if len(self.pending) > 0:
+            events = np.array(self.pending, dtype=event_dtype)
+            with open(self.path_events, "ab") as file:
+                file.write(events.tobytes())
+            self.pending = []
+
+    def save_checkpoint(self):
+        self.flush()
+        os.makedirs(self.path_checkpoints, exist_ok=True)
+        save_snapshot(self.game, self.get_checkpoint_path(self.event_count))
+
+    def get_checkpoint_path(self, event_count):
+        return os.path.join(self.path_checkpoints, f"Checkpoint_{event_count:08}.npz")
+
+
+    # Replaying
+
+    def load_events(self):
+        self.flush()
+        if self.event_count == 0:
+            return np.zeros(0, dtype=event_dtype)
+        return np.memmap(self.path_events, dtype=event_dtype, mode="r")
+
+    def get_checkpoint_counts(self):
+        checkpoint_counts = sorted(
+            int(file_name[11:19]) for file_name in os.listdir(self.path_checkpoints))
+        return checkpoint_counts
+
+    def load_move(self, move):
+        """
+        Sets the game to the position at the end of the given move.
+        Recording continues from the end of the journal, so a game that
+        is loaded to an earlier move should not then be played on.
+        """
+        events = self.load_events()
+        target = np.searchsorted(events["Move"], move, side="right")
+        checkpoint = max(
+            count for count in self.get_checkpoint_counts() if count <= target)
+        self.game.load_from_snapshot(self.get_checkpoint_path(checkpoint))
+        self.game.initialise_longest_road()
+        self.game.initialise_production()
+        self.game.initialise_maritime()
+        self.replay(events[checkpoint:target])
+
+    def replay(self, events):
+        self.recording = False
+        try:
+            for event in events:
+                self.replay_event(event)
+        finally:
+            self.recording = True
+
+    def replay_event(self, event):
+        move, kind, player_index, type_code, index, change, _ = event.tolist()
+        player = self.game.players[player_index] if player_index != -1 else None
+        match event_kinds[kind]:
+            case "Move": self.replay_move(move)
+            case "Road": self.game.buy_road_from_index(player, index)
+            case "Vertex": self.game.buy_vertex_from_index(
+                player, real_estates[type_code], index)
+            case "Robber": self.game.update_robber(index)
+            case "Card": self.game.update_state(card_types[type_code], {player: change})
+
+    def replay_move(self, move):
+        self.game.move = move
+        self.game.random.dice.skip(1)
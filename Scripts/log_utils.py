@@ -0,0 +1,43 @@
+"""
+Logging for the engine without building messages that are not written.
+
+Messages that are expensive to build are given to the logger as a
+LazyMessage argument, which is only turned into a string when a handler
+writes the record. The level of each game logger is set to the lowest
+level of its handlers, so records that no handler would write are not
+created at all.
+
+A silent logger has no handlers and is disabled, which is meant for
+simulation workers. Setting the environment variable CATAN_SILENT to 1
+before the game is imported makes every game silent by default.
+"""
+
+
+import os
+import logging
+
+
+silent_default = (os.environ.get("CATAN_SILENT") == "1")
+
+
+class LazyMessage():
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+
+    def __str__(self):
+        return str(self.function(*self.args))
+
+
+def set_level_from_handlers(log):
+    handler_levels = [handler.level for handler in log.handlers]
+    if len(handler_levels) == 0:
+        log.setLevel(logging.CRITICAL + 1)
+    else:
+        log.setLevel(min(handler_levels))
+
+def silence(log):
+    log.handlers.clear()
+    log.disabled = True
+    set_level_from_handlers(log)
@@ -0,0 +1,110 @@
+"""
+Independent random number streams for a game.
+
+Every game owns a RandomStreams made from its seed, which spawns one
+child Generator for each name in stream_names. Drawing from one stream
+never changes what another stream draws, so the dice of a game do not
+depend on how often the layout was generated or how many choices a
+policy made. Nothing here touches the global NumPy generator, so any
+number of games in one process are independent of each other.
+
+Dice:   dice rolls, drawn in blocks by Dice
+Deck:   shuffling the development card deck
+Layout: generating layouts
+Policy: choices made by players, spawned again for each player
+
+Rolls are drawn in blocks of block_size and handed out in order. The
+rolls of a game are the same however they are asked for, but changing
+block_size changes them. A saved game keeps the number of rolls made
+and the bit generator states of the other streams, so every stream
+carries on from where it was when the game is loaded.
+"""
+
+
+import numpy as np
+
+
+stream_names = ["Dice", "Deck", "Layout", "Policy"]
+
+
+class RandomStreams():
+
+    def __init__(self, seed=None):
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.generators = {
+            name: np.random.default_rng(child)
+            for name, child in zip(
+                stream_names, self.seed_sequence.spawn(len(stream_names)))}
+        self.dice = Dice(self.generators["Dice"])
+
+    @property
+    def deck(self):
+        return self.generators["Deck"]
+
+    @property
+    def layout(self):
+        return self.generators["Layout"]
+
+    @property
+    def policy(self):
+        return self.generators["Policy"]
+
+    def spawn(self, name, count):
+        return self.generators[name].spawn(count)
+
+    # The dice are restored by skipping rolls instead, as the rolls
+    # waiting in the current block are not part of the generator state.
+    def get_states(self):
+        states = {
+            name: generator.bit_generator.state
+            for name, generator in self.generators.items()
+            if name != "Dice"}
+        return states
+
+    def set_states(self, states):
+        for name, state in states.items():
+            self.generators[name].bit_generator.state = state
+
+
+class Dice():
+
+    block_size = 1024
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.block = np.zeros(0, dtype=int)
+        self.position = 0
+        self.rolled = 0
+
+    def roll(self, count=None):
+        """
+        Returns the total of two dice. When count is given an array of
+        count totals is returned.
+        """
+        if count is None:
+            return int(self.roll(1)[0])
+        rolls = np.empty(count, dtype=int)
+        filled = 0
+        while filled < count:
+            if self.position == self.block.size:
+                self.draw_block()
+            taken = min(count - filled, self.block.size - self.position)
+            rolls[filled:filled + taken] = self.block[self.position:self.position + taken]
+            self.position += taken
+            filled += taken
+        self.rolled += count
+        return rolls
+
+    # Blocks are always the same size so that the rolls do not depend
+    # on how many were asked for at once.
+    def draw_block(self):
+        self.block = self.rng.integers(1, 7, (self.block_size, 2)).sum(axis=1)
+        self.position = 0
+
+    def skip(self, count):
+        """
+        Moves past count rolls, which is used to carry on the rolls of a
+        loaded game from where they were saved.
+        """
+        if count > 0:
+            self.roll(count)
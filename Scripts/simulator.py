@@ -0,0 +1,352 @@
+"""
+Simulating a batch of independent games in lock-step.
+
+Every game in the batch is at the same move, and each stage of a move
+is done for all games at once with arrays that have the game as their
+first axis. The positions are held in a batched GameState, so any game
+can be taken out as a GameState of its own.
+
+A move is made up of the following stages.
+
+    Dice:        one roll for every game
+    Production:  the production tensors of every game are built and the
+                 resources gained from the roll are looked up
+    Beliefs:     every perspective's card state is shifted by the public
+                 change in each player's resources
+    Robber:      on a 7 the player to move chooses a tile for the robber
+    Building:    the player to move chooses actions until they pass or
+                 actions_per_move is reached
+
+Choices are made by a policy, which is any callable taking the simulator
+and a boolean mask of legal actions of shape (N, size) over the action
+space in action_space, and returning the chosen action id of each game
+as an array of shape (N,). The player choosing in each game is given by
+player_indexes. Only the End Turn, Settlements, Cities, Roads and Robber
+sections are used, and ending the turn passes. Games that have finished
+only have End Turn as a legal action.
+
+Trading, development cards, discarding on a 7, stealing, and the
+longest road and largest army are not simulated, so the victory points
+of a player are only from their settlements and cities.
+"""
+
+
+import numpy as np
+
+from Board.compiled_board import get_compiled_board
+from Board.board_utils import (
+    get_occupied,
+    get_any_neighbour)
+from Board.layout_generator import (
+    generate_layouts,
+    desert_code)
+from Board.production import (
+    get_production_tensors,
+    get_resources_gained,
+    vertex_weights)
+from Players.state_utils import get_shifted_states
+from snapshot import card_offsets
+from game_state import GameState
+from random_streams import RandomStreams
+from action_space import (
+    get_action_space,
+    section_names)
+from global_variables import (
+    resource_types,
+    card_types,
+    real_estates)
+
+
+player_count = 4
+
+# Player i's perspective j is of player (i + j) % 4 as in PlayerRegular.
+perspective_players = (
+    np.arange(player_count).reshape(-1, 1) + np.arange(player_count)) % player_count
+
+initial_placement_order = [0, 1, 2, 3, 3, 2, 1, 0]
+
+
+class BatchSimulator():
+
+    building_sections = ["End Turn", "Settlements", "Cities", "Roads"]
+    actions_per_move = 4
+    victory_points_to_win = 10
+    hand_limit = 18
+
+    def __init__(self, count, policy=None, layouts=None, random=None):
+        """
+        Sets up count games. Layouts can be given as a pair of (N, 19)
+        arrays as made by the layout generator, and are otherwise
+        generated. The default policy chooses uniformly at random.
+        Random numbers are drawn from the RandomStreams given, or from
+        new unseeded streams.
+        """
+        self.count = count
+        self.random = random if random is not None else RandomStreams()
+        self.policy = (
+            policy if policy is not None else RandomPolicy(self.random.policy))
+        compiled_board = get_compiled_board()
+        self.topology = compiled_board.topology
+        self.action_space = get_action_space()
+        self.costs = self.action_space.costs
+        self.set_layouts(layouts, compiled_board.tile_definitions)
+        self.initialise_state()
+
+    def set_layouts(self, layouts, tile_definitions):
+        if layouts is None:
+            layouts = generate_layouts(
+                self.count, self.topology, tile_definitions, rng=self.random.layout)
+        self.tile_types, self.tile_numbers = (np.asarray(array) for array in layouts)
+        self.tile_resources = np.where(
+            self.tile_types == desert_code, -1, self.tile_types).astype(int)
+        self.tile_numbers = self.tile_numbers.astype(int)
+
+    def initialise_state(self):
+        self.state = GameState.empty(self.topology, player_count).fork(self.count)
+        self.state.data["Robber"] = np.argmax(self.tile_types == desert_code, axis=1)
+        self.real_estate = self.state.get_real_estate()
+        self.hands = np.zeros((self.count, player_count, len(resource_types)), dtype=int)
+        self.finished = np.zeros(self.count, dtype=bool)
+        self.winners = np.full(self.count, -1)
+        self.games = np.arange(self.count)
+        self.player_indexes = np.zeros(self.count, dtype=int)
+
+
+    # Running
+
+    def run(self, move_limit=500):
+        self.place_initial_real_estate()
+        while not np.all(self.finished) and self.state.move.max() < move_limit:
+            self.step()
+        return self.get_results()
+
+    def step(self):
+        player_indexes = self.state.move % player_count
+        self.player_indexes = player_indexes
+        self.state.data["Move"][~self.finished] += 1
+        dice = self.random.dice.roll(self.count)
+        self.distribute_resources(dice)
+        self.move_robber(player_indexes, dice == 7)
+        self.build(player_indexes)
+        self.update_finished()
+
+    def get_results(self):
+        results = {
+            "Winners": self.winners,
+            "Victory Points": self.get_victory_points(),
+            "Moves": self.state.move.copy()}
+        return results
+
+
+    # Resources
+
+    def distribute_resources(self, dice):
+        weights = sum(
+            weight * self.real_estate[vertex_type].astype(int)
+            for vertex_type, weight in vertex_weights.items())
+        tensors = get_production_tensors(
+            self.topology, self.tile_resources, self.tile_numbers,
+            self.state.robber_index, weights)
+        resources_gained = get_resources_gained(tensors, dice)
+        resources_gained[self.finished] = 0
+        self.add_resources(resources_gained)
+
+    # Belief arrays have no room for more than hand_limit cards of a
+    # type, so anything beyond that is not given out.
+    def add_resources(self, changes):
+        changes = np.minimum(changes, self.hand_limit - self.hands)
+        self.hands += changes
+        self.update_beliefs(changes)
+
+    def update_beliefs(self, changes):
+        perspective_changes = changes[:, perspective_players]
+        for resource_index, resource in enumerate(resource_types):
+            card_index = card_types.index(resource)
+            states = self.state.card_states[
+                ..., card_offsets[card_index]:card_offsets[card_index + 1]]
+            resource_changes = perspective_changes[..., resource_index]
+            changed = (resource_changes != 0)
+            if np.any(changed):
+                states[changed] = get_shifted_states(
+                    resource, states[changed], resource_changes[changed])
+
+    def get_initial_resources(self, player_indexes, vertex_indexes):
+        tile_indexes = self.topology.vertex_tiles[vertex_indexes]
+        padded_resources = np.hstack(
+            (self.tile_resources, np.full((self.count, 1), -1)))
+        tile_resources = padded_resources[self.games[:, np.newaxis], tile_indexes]
+        changes = np.zeros(self.hands.shape, dtype=int)
+        for column in tile_resources.T:
+            produced = (column != -1)
+            np.add.at(
+                changes,
+                (self.games[produced], player_indexes[produced], column[produced]),
+                1)
+        return changes
+
+
+    # Actions
+
+    # Games that are required to act cannot end their turn.
+    def get_action_masks(self, sections, required=None):
+        masks = self.action_space.get_masks(sections, self.count)
+        masks[self.finished, 1:] = False
+        if required is not None:
+            masks[required, 0] = False
+        return masks
+
+    def get_building_masks(self, player_indexes):
+        masks = self.action_space.get_legal_masks(
+            self.state, player_indexes,
+            resources=self.hands[self.games, player_indexes],
+            sections=self.building_sections)
+        masks[self.finished, 1:] = False
+        return masks
+
+    def choose_actions(self, masks):
+        actions = np.asarray(self.policy(self, masks))
+        if not np.all(masks[self.games, actions]):
+            raise ValueError("The policy chose an action that is not legal")
+        return self.action_space.split_ids(actions)
+
+    # A game that ends its turn builds nothing more this move.
+    def build(self, player_indexes):
+        passed = np.zeros(self.count, dtype=bool)
+        for _ in range(self.actions_per_move):
+            masks = self.get_building_masks(player_indexes)
+            masks[passed, 1:] = False
+            sections, indexes = self.choose_actions(masks)
+            passed |= (sections == 0)
+            if np.all(passed):
+                break
+            for real_estate_type in real_estates:
+                games = np.nonzero(
+                    sections == section_names.index(real_estate_type))[0]
+                self.place(real_estate_type, games, player_indexes[games], indexes[games])
+                self.pay(real_estate_type, games, player_indexes[games])
+
+    def place(self, real_estate_type, games, player_indexes, indexes):
+        self.real_estate[real_estate_type][games, player_indexes, indexes] = 1
+
+    def pay(self, real_estate_type, games, player_indexes):
+        changes = np.zeros(self.hands.shape, dtype=int)
+        changes[games, player_indexes] = -self.costs[real_estate_type]
+        self.add_resources(changes)
+
+    def move_robber(self, player_indexes, rolled_seven):
+        robber_moves = rolled_seven & ~self.finished
+        if not np.any(robber_moves):
+            return
+        tiles = np.ones((self.count, self.topology.tile_count), dtype=bool)
+        tiles[self.games, self.state.robber_index] = False
+        tiles[~robber_moves] = False
+        _, indexes = self.choose_actions(
+            self.get_action_masks({"Robber": tiles}, required=robber_moves))
+        self.state.data["Robber"][robber_moves] = indexes[robber_moves]
+
+
+    # Initial placement
+
+    # Each player places a settlement anywhere that is not too close to
+    # another, then a road next to it. Resources are given for the tiles
+    # around the second settlement.
+    def place_initial_real_estate(self):
+        for round_index, player_index in enumerate(initial_placement_order):
+            player_indexes = np.full(self.count, player_index)
+            self.player_indexes = player_indexes
+            vertex_indexes = self.place_initial_settlement(player_indexes)
+            self.place_initial_road(player_indexes, vertex_indexes)
+            if round_index >= player_count:
+                self.add_resources(
+                    self.get_initial_resources(player_indexes, vertex_indexes))
+
+    def place_initial_settlement(self, player_indexes):
+        occupied_vertices, _ = get_occupied(self.real_estate)
+        blocked_vertices = occupied_vertices | get_any_neighbour(
+            occupied_vertices, self.topology.vertex_vertices)
+        _, indexes = self.choose_actions(self.get_action_masks(
+            {"Settlements": ~blocked_vertices}, required=np.ones(self.count, dtype=bool)))
+        self.place("Settlements", self.games, player_indexes, indexes)
+        return indexes
+
+    def place_initial_road(self, player_indexes, vertex_indexes):
+        _, occupied_edges = get_occupied(self.real_estate)
+        vertex_edges = self.topology.vertex_edges[vertex_indexes]
+        roads = np.zeros((self.count, self.topology.edge_count + 1), dtype=bool)
+        roads[self.games[:, np.newaxis], vertex_edges] = True
+        roads = roads[:, :-1] & ~occupied_edges
+        _, indexes = self.choose_actions(self.get_action_masks(
+            {"Roads": roads}, required=np.ones(self.count, dtype=bool)))
+        self.place("Roads", self.games, player_indexes, indexes)
+
+
+    # Victory
+
+    def get_victory_points(self):
+        victory_points = (
+            self.real_estate["Settlements"].sum(axis=2, dtype=int)
+            + self.real_estate["Cities"].sum(axis=2, dtype=int))
+        return victory_points
+
+    def update_finished(self):
+        victory_points = self.get_victory_points()
+        newly_finished = (
+            (victory_points.max(axis=1) >= self.victory_points_to_win) & ~self.finished)
+        self.winners[newly_finished] = victory_points[newly_finished].argmax(axis=1)
+        self.finished |= newly_finished
+
+
+class RandomPolicy():
+
+    """
+    Chooses uniformly between the legal actions of each game. The score
+    of passing is scaled by pass_weight, so players usually build when
+    they are able to and games move forward.
+    """
+
+    def __init__(self, rng=None, pass_weight=0.2):
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.pass_weight = pass_weight
+
+    def __call__(self, simulator, masks):
+        weights = self.rng.random(masks.shape)
+        weights[:, 0] *= self.pass_weight
+        return np.where(masks, weights, -1).argmax(axis=1)
+
+
+class BuilderPolicy():
+
+    """
+    Builds whenever it can, preferring the earlier action types in
+    preferences and choosing uniformly within an action type.
+    """
+
+    preferences = ["Cities", "Settlements", "Roads", "Robber"]
+
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def __call__(self, simulator, masks):
+        weights = self.rng.random(masks.shape)
+        for rank, section in enumerate(reversed(self.preferences)):
+            weights[:, simulator.action_space.get_slice(section)] += rank + 1
+        return np.where(masks, weights, -1).argmax(axis=1)
+
+
+class SeatPolicy():
+
+    """
+    Gives each seat its own policy. The policy of the player to move
+    chooses the actions of the games they are moving in.
+    """
+
+    def __init__(self, policies):
+        self.policies = policies
+
+    def __call__(self, simulator, masks):
+        actions = np.zeros(len(masks), dtype=int)
+        for seat, policy in enumerate(self.policies):
+            games = (simulator.player_indexes == seat)
+            if np.any(games):
+                actions[games] = np.asarray(policy(simulator, masks))[games]
+        return actions
@@ -0,0 +1,50 @@
+"""
+Binary snapshots of a game state.
+
+A snapshot is an uncompressed npz file holding the meta data as a small
+JSON header, the real estate of every player stacked as in
+Game.get_real_estate, and the card states of every perspective as one
+array of shape (players, perspectives, 132). Each card state is the
+distributions of the card types in the order of card_types joined end to
+end. Loading copies these arrays into the game state with one assignment
+each, so no element is converted through Python. The JSON state format
+is kept for reading by people.
+"""
+
+
+import json
+
+import numpy as np
+
+from global_variables import (
+    card_types,
+    card_sizes)
+
+
+card_offsets = np.cumsum([0] + [card_sizes[card_type] for card_type in card_types])
+
+
+def save_snapshot(game, path):
+    arrays = (
+        {"meta_data": np.array(json.dumps(game.get_meta_data()))}
+        | game.get_real_estate()
+        | {"card_states": game.state.card_states})
+    with open(path, "wb") as file:
+        np.savez(file, **arrays)
+
+def get_flat_card_state(card_state):
+    return np.concatenate([card_state[card_type] for card_type in card_types])
+
+def load_snapshot(path):
+    with np.load(path) as snapshot_file:
+        arrays = dict(snapshot_file)
+    meta_data = json.loads(str(arrays.pop("meta_data")))
+    card_states = arrays.pop("card_states")
+    return meta_data, arrays, card_states
+
+def get_card_state(flat_card_state):
+    card_state = {
+        card_type: flat_card_state[start:end]
+        for card_type, start, end in zip(
+            card_types, card_offsets[:-1], card_offsets[1:])}
+    return card_state
@@ -0,0 +1,55 @@
+"""
+Contiguous buffers for the candidate states of a trade.
+
+A player considering a chunk of trades has one StateArena for each of
+their perspectives. The card states are a single block of shape
+(count + 1, 132) with the card types at the offsets in snapshot. The
+first row is the current state and each other row is the state after
+one candidate. The block is filled with the current state when it is
+made and then written in place, so a card type that no candidate
+changes is never written again.
+
+Real estate does not change in a card trade, so each real estate type is
+a zero-stride view repeating the current real estate for every row. It
+takes no memory until get_batch copies the arena into one array for
+evaluation.
+"""
+
+
+import numpy as np
+
+from snapshot import card_offsets
+from global_variables import (
+    card_types,
+    real_estates)
+
+
+class StateArena():
+
+    def __init__(self, perspective, count):
+        self.rows = count + 1
+        self.cards = np.empty((self.rows, card_offsets[-1]))
+        self.cards[:] = perspective.flat_card_state
+        self.real_estate = {
+            real_estate_type: np.broadcast_to(
+                indicators, (self.rows, indicators.size))
+            for real_estate_type, indicators in perspective.them.real_estate.items()}
+
+    def get_card_states(self, card_type):
+        index = card_types.index(card_type)
+        return self.cards[:, card_offsets[index]:card_offsets[index + 1]]
+
+    def set_card_states(self, card_type, states):
+        self.get_card_states(card_type)[1:] = states
+
+    @property
+    def states(self):
+        card_states = {
+            card_type: self.get_card_states(card_type)
+            for card_type in card_types}
+        return card_states | self.real_estate
+
+    def get_batch(self):
+        return np.concatenate(
+            [self.cards] + [self.real_estate[real_estate_type]
+                            for real_estate_type in real_estates], axis=1)
@@ -0,0 +1,266 @@
+"""
+Plays many simulated games in a pool of processes.
+
+    python tournament.py Nightly --games 10000 --policies Builder Random --seed 1
+
+Each game is played by a BatchSimulator holding that one game, with a
+policy for each seat. Policies are named from policy_types or given as
+module:name for any class that takes a Generator and is called like the
+policies in simulator. When fewer policies than seats are given they are
+repeated, and with --rotate the seats are rotated by the game index so
+every policy plays from every seat.
+
+The seed of each game is spawned from the master seed by the index of
+the game, and the simulator and the policies draw from the random
+streams of the game made from that seed. A game therefore plays out the
+same way whichever worker plays it and in whatever order. Workers set
+games up without writing anything to Data/Games, and with --save-games
+the final position of each game is saved there as well, along with any
+generated layout in Data/Layouts.
+
+Results are appended to Results.jsonl in Data/Tournaments as each game
+finishes, one line per game. The settings are kept in Settings.json, and
+running a tournament again with the same settings only plays the games
+missing from its results, so an interrupted tournament is resumed and a
+finished one can be extended with more games.
+"""
+
+
+import os
+import json
+import time
+import argparse
+import importlib
+from multiprocessing import Pool
+
+import numpy as np
+
+from game import Game
+from simulator import (
+    BatchSimulator,
+    RandomPolicy,
+    BuilderPolicy,
+    SeatPolicy,
+    player_count)
+from Board.layout_store import LayoutStore
+from global_variables import path_tournaments
+
+
+policy_types = {
+    "Random": RandomPolicy,
+    "Builder": BuilderPolicy}
+
+# Settings that decide how games play out. A tournament can only be
+# resumed with the same values.
+played_settings = ["Seed", "Policies", "Rotate", "Layout", "Layout Store", "Move Limit"]
+
+# Set separately in each worker process by init_worker
+worker = {}
+
+
+def init_worker(name, settings, save_games):
+    worker["Name"] = name
+    worker["Settings"] = settings
+    worker["Save Games"] = save_games
+    worker["Policy Types"] = [
+        get_policy_type(policy_name) for policy_name in settings["Policies"]]
+    if settings["Layout Store"] is not None:
+        worker["Layout Store"] = LayoutStore(settings["Layout Store"])
+
+def get_policy_type(policy_name):
+    if policy_name in policy_types:
+        return policy_types[policy_name]
+    module_name, _, class_name = policy_name.partition(":")
+    if class_name == "":
+        raise ValueError(f"Unknown policy {policy_name}")
+    return getattr(importlib.import_module(module_name), class_name)
+
+def play_game(game_index):
+    start = time.perf_counter()
+    seed_sequence = get_seed_sequence(worker["Settings"]["Seed"], game_index)
+    game_seed = int(seed_sequence.generate_state(1)[0])
+    game = create_game(game_index, game_seed)
+    seats = get_seats(game_index)
+    simulator = BatchSimulator(
+        1, policy=get_seat_policy(seats, game),
+        layouts=[array[np.newaxis] for array in game.board.get_layout_arrays()],
+        random=game.random)
+    results = simulator.run(worker["Settings"]["Move Limit"])
+    if worker["Save Games"]:
+        save_game(game, simulator)
+    return get_game_result(
+        game_index, game_seed, game, seats, results, time.perf_counter() - start)
+
+def get_seed_sequence(seed, game_index):
+    return np.random.SeedSequence(seed, spawn_key=(game_index,))
+
+def create_game(game_index, game_seed):
+    save_games = worker["Save Games"]
+    name = f"{worker['Name']}_{game_index:06}" if save_games else worker["Name"]
+    game = Game(name, seed=game_seed, silent=True, save_files=save_games)
+    if "Layout Store" in worker:
+        store = worker["Layout Store"]
+        game.board.load_layout(game_index % len(store), store)
+    elif worker["Settings"]["Layout"] is not None:
+        game.board.load_layout(worker["Settings"]["Layout"])
+    else:
+        game.board.generate_layout(name if save_games else None)
+    return game
+
+def get_seats(game_index):
+    policy_names = worker["Settings"]["Policies"]
+    seats = [policy_names[seat % len(policy_names)] for seat in range(player_count)]
+    if worker["Settings"]["Rotate"]:
+        shift = game_index % player_count
+        seats = seats[shift:] + seats[:shift]
+    return seats
+
+def get_seat_policy(seats, game):
+    policy_types = dict(zip(worker["Settings"]["Policies"], worker["Policy Types"]))
+    policies = [
+        policy_types[policy_name](rng)
+        for policy_name, rng in zip(seats, game.random.spawn("Policy", player_count))]
+    return SeatPolicy(policies)
+
+def save_game(game, simulator):
+    game.start_game()
+    game.set_state(simulator.state[0])
+    game.save()
+
+def get_game_result(game_index, game_seed, game, seats, results, duration):
+    winner = int(results["Winners"][0])
+    game_result = {
+        "Game": game_index,
+        "Seed": game_seed,
+        "Layout": getattr(game.board, "layout_name", None),
+        "Seats": seats,
+        "Winner": winner if winner != -1 else None,
+        "Winner Policy": seats[winner] if winner != -1 else None,
+        "Victory Points": results["Victory Points"][0].tolist(),
+        "Moves": int(results["Moves"][0]),
+        "Duration": round(duration, 4)}
+    return game_result
+
+
+def run_tournament(name, games, policies, seed=0, workers=None, rotate=False,
+                   layout=None, layout_store=None, move_limit=500, save_games=False):
+    path = os.path.join(path_tournaments, name)
+    settings = prepare_settings(path, {
+        "Seed": seed,
+        "Policies": list(policies),
+        "Rotate": rotate,
+        "Layout": layout,
+        "Layout Store": layout_store,
+        "Move Limit": move_limit,
+        "Games": games})
+    path_results = os.path.join(path, "Results.jsonl")
+    completed = load_completed_games(path_results)
+    game_indexes = [index for index in range(games) if index not in completed]
+    print(f"Playing {len(game_indexes)} of {games} games in tournament {name}")
+    play_games(name, settings, save_games, game_indexes, workers, path_results)
+    return path_results
+
+def prepare_settings(path, settings):
+    path_settings = os.path.join(path, "Settings.json")
+    if os.path.exists(path_settings):
+        with open(path_settings, "r") as file:
+            saved_settings = json.load(file)
+        check_settings(saved_settings, settings)
+        settings["Games"] = max(settings["Games"], saved_settings["Games"])
+    os.makedirs(path, exist_ok=True)
+    with open(path_settings, "w+") as file:
+        json.dump(settings, file, indent=2)
+    return settings
+
+def check_settings(saved_settings, settings):
+    for key in played_settings:
+        if saved_settings[key] != settings[key]:
+            raise ValueError(
+                f"Tournament was played with {key} {saved_settings[key]} "
+                f"so cannot be resumed with {settings[key]}")
+
+# A line cut short by an interruption is removed so that appending
+# carries on from the last complete result.
+def load_completed_games(path_results):
+    if not os.path.exists(path_results):
+        return set()
+    completed, complete_size = set(), 0
+    with open(path_results, "rb") as file:
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            completed.add(json.loads(line)["Game"])
+            complete_size += len(line)
+    os.truncate(path_results, complete_size)
+    return completed
+
+def play_games(name, settings, save_games, game_indexes, workers, path_results):
+    start = time.perf_counter()
+    initargs = (name, settings, save_games)
+    with Pool(workers, initializer=init_worker, initargs=initargs) as pool, \
+         open(path_results, "a") as file:
+        game_results = pool.imap_unordered(play_game, game_indexes, chunksize=4)
+        for game_result in game_results:
+            file.write(json.dumps(game_result) + "\n")
+            file.flush()
+    duration = time.perf_counter() - start
+    print(f"Played {len(game_indexes)} games in {duration:.1f} s")
+
+
+def load_results(path_results):
+    with open(path_results, "r") as file:
+        game_results = [json.loads(line) for line in file]
+    return game_results
+
+def summarise_results(game_results):
+    summary = {}
+    for game_result in game_results:
+        for policy_name, victory_points in zip(
+                game_result["Seats"], game_result["Victory Points"]):
+            policy_summary = summary.setdefault(
+                policy_name, {"Seats": 0, "Wins": 0, "Victory Points": 0})
+            policy_summary["Seats"] += 1
+            policy_summary["Victory Points"] += victory_points
+        if game_result["Winner Policy"] is not None:
+            summary[game_result["Winner Policy"]]["Wins"] += 1
+    return summary
+
+def print_summary(game_results):
+    finished = sum(game_result["Winner"] is not None for game_result in game_results)
+    print(f"{len(game_results)} games, {finished} finished")
+    for policy_name, policy_summary in summarise_results(game_results).items():
+        print(f"{policy_name}: "
+              f"{policy_summary['Wins']} wins from {policy_summary['Seats']} seats, "
+              f"mean victory points "
+              f"{policy_summary['Victory Points'] / policy_summary['Seats']:.2f}")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Play simulated games between policies in a pool of processes")
+    parser.add_argument("name", help="name of the tournament in Data/Tournaments")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--policies", nargs="+", default=["Random"],
+                        help="policy of each seat, repeated to fill the seats")
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes, defaults to the number of cores")
+    parser.add_argument("--rotate", action="store_true",
+                        help="rotate the seats of the policies between games")
+    parser.add_argument("--layout", default=None,
+                        help="layout in Data/Layouts played in every game")
+    parser.add_argument("--layout-store", default=None,
+                        help="layout store whose layouts are played in turn")
+    parser.add_argument("--move-limit", type=int, default=500)
+    parser.add_argument("--save-games", action="store_true",
+                        help="save the final position of each game in Data/Games")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    path_results = run_tournament(
+        arguments.name, arguments.games, arguments.policies, arguments.seed,
+        arguments.workers, arguments.rotate, arguments.layout,
+        arguments.layout_store, arguments.move_limit, arguments.save_games)
+    print_summary(load_results(path_results))
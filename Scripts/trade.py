@@ -1,52 +1,52 @@
-from hgutilities.utils import json
 import numpy as np
-import pandas as pd
 
+from action_table import ActionTable
+from state_arena import StateArena
 from global_variables import (
     sizes,
-    real_estates,
-    action_columns)
+    card_types)
 
 
 class Trade():
 
-    def __init__(self, turn, player):
+    def __init__(self, turn, player, count=0):
         self.game = turn.game
         self.turn = turn
         self.log = turn.log
         self.player = player
-        self.init_states()
+        self.init_states(count)
         self.init_actions()
 
-    def init_states(self):
+    # Each perspective has an arena with a row for the current state
+    # and one for each of the count trades being considered.
+    def init_states(self, count):
         self.states = [
-            perspective.get_initial_states()
+            StateArena(perspective, count)
             for perspective in self.player.perspectives]
 
+    # The first row is the action of doing nothing, matching the
+    # current state at the start of each stack of states.
     def init_actions(self):
-        self.actions = pd.DataFrame([{
-            item: np.nan for item in action_columns[1:]}])
+        self.actions = ActionTable()
+        self.actions.add_rows(1)
     
     def update_states(self, index, card_type, states):
-        self.states[index][card_type] = np.vstack(
-            (self.states[index][card_type], states))
+        self.states[index].set_card_states(card_type, states)
 
     def update_actions_cards(self):
-        actions_cards = pd.DataFrame(self.player.card_trades)
-        actions_cards.loc[:, "Trade Partner"] = self.turn.other.name
-        self.actions = pd.concat(
-            (self.actions, actions_cards), axis=0).reset_index()
+        rows = self.add_card_rows(self.player.card_trades)
+        self.actions.get_column("Trade Partner", rows)[:] = (
+            self.game.players.index(self.turn.other))
 
-    # Each state passed into the neural network must look the same. That
-    # means that for each card states being considered there must be a
-    # corresponding real estate.
-    
-    def stack_real_estate(self, count):
-        for perspective, states in zip(self.player.perspectives, self.states):
-            for real_estate in real_estates:
-                states[real_estate] = np.tile(
-                    perspective.base.real_estate[real_estate], (count, 1))
+    # Trades with the bank have no trade partner, which is left missing.
+    def update_actions_bank(self, bank_trades):
+        self.add_card_rows(bank_trades)
 
+    def add_card_rows(self, card_changes):
+        rows = self.actions.add_rows(len(card_changes[card_types[0]]))
+        self.actions.get_group("Cards", rows)[:] = np.column_stack([
+            card_changes[card_type] for card_type in card_types])
+        return rows
 
     # After all player related state stuff is done.
     
@@ -57,15 +57,12 @@ class Trade():
         self.set_meta_data()
 
     def get_count(self):
-        counts = np.array([
-            array.shape[0]
-            for perspective_state in self.states
-            for array in perspective_state.values])
+        counts = np.array([arena.rows for arena in self.states])
         return counts
 
     def validate_counts(self, counts):
         if np.any(counts != np.mean(counts)):
-            self.log.error(f"Invalid states\n{json.dumps(self.states)}")
+            self.log.error(f"Invalid state counts {counts}")
             raise ValueError(
                 "All states must be the same size")
     
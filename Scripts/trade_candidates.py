@@ -0,0 +1,81 @@
+"""
+Enumerating the card trades between two players in chunks.
+
+A card trade is described by the change in each resource the player
+has, which is anything from losing all of theirs to gaining all of the
+other player's. Trades are numbered in mixed radix with one digit for
+each resource, so a range of trade numbers is decoded into a chunk of
+trades with a few integer operations and without building the others.
+
+Filters run on the decoded resource changes before the changes of any
+other card type are made, so memory is bounded by chunk_size rather than
+the product of the hand sizes. Chunks are made from chunk_size trade
+numbers at a time and hold at most that many trades after filtering.
+Only resources are traded, so every other card type has a change of 0.
+"""
+
+
+import numpy as np
+
+from global_variables import (
+    card_types,
+    resource_types)
+
+
+chunk_size = 4096
+
+
+def get_trade_chunks(player_cards, other_cards, chunk_size=chunk_size,
+                     max_cards_moved=None, both_sides=True):
+    """
+    Yields the changes to the player's cards as a dictionary of arrays
+    keyed by card type, one chunk of trades at a time. The other player
+    has the opposite changes.
+
+    max_cards_moved: trades moving more cards in total are removed
+    both_sides:      trades where either player gives nothing are removed
+    """
+    lowest_changes, radices = get_change_ranges(
+        player_cards, other_cards, max_cards_moved)
+    trade_count = int(np.prod(radices))
+    for start in range(0, trade_count, chunk_size):
+        stop = min(start + chunk_size, trade_count)
+        changes = decode_trades(start, stop, radices) + lowest_changes
+        changes = filter_trades(changes, max_cards_moved, both_sides)
+        if len(changes) > 0:
+            yield get_card_changes(changes)
+
+# No single resource can change by more than max_cards_moved, so the
+# range of each digit is narrowed before any trades are numbered.
+def get_change_ranges(player_cards, other_cards, max_cards_moved):
+    player_holdings = np.array([player_cards[resource] for resource in resource_types])
+    other_holdings = np.array([other_cards[resource] for resource in resource_types])
+    lowest_changes, highest_changes = -player_holdings, other_holdings
+    if max_cards_moved is not None:
+        lowest_changes = np.maximum(lowest_changes, -max_cards_moved)
+        highest_changes = np.minimum(highest_changes, max_cards_moved)
+    radices = highest_changes - lowest_changes + 1
+    return lowest_changes, radices
+
+# The last resource is the fastest changing digit.
+def decode_trades(start, stop, radices):
+    trade_numbers = np.arange(start, stop)
+    strides = np.cumprod(np.append(1, radices[:0:-1]))[::-1]
+    digits = (trade_numbers[:, np.newaxis] // strides) % radices
+    return digits
+
+def filter_trades(changes, max_cards_moved, both_sides):
+    keep = np.ones(len(changes), dtype=bool)
+    if max_cards_moved is not None:
+        keep &= (np.abs(changes).sum(axis=1) <= max_cards_moved)
+    if both_sides:
+        keep &= np.any(changes < 0, axis=1) & np.any(changes > 0, axis=1)
+    return changes[keep]
+
+def get_card_changes(changes):
+    card_changes = {
+        card_type: np.zeros(len(changes), dtype=int)
+        for card_type in card_types}
+    for resource_index, resource in enumerate(resource_types):
+        card_changes[resource] = changes[:, resource_index]
+    return card_changes
@@ -1,24 +1,26 @@
 import numpy as np
-from hgutilities.utils import json
 
 from trade import Trade
-from output_state import plot_card_state
-from Board.board_utils import get_buildable_roads
-from global_variables import (
-    card_types,
-    resource_types)
+from trade_candidates import (
+    get_trade_chunks,
+    chunk_size)
+from utils import get_json_string
+from log_utils import LazyMessage
+from Board.board_utils import get_legal_placements
+from Board.bitboard import get_indexes
+from global_variables import card_types
 
 
-zero = np.array([0])
-
 class Turn():
 
     trade_limit = 10
+    trade_chunk_size = chunk_size
+    max_cards_traded = None
+    max_bank_trades = 2
     
     def __init__(self, game):
         self.game = game
         self.log = self.game.log
-        np.random.seed(self.game.seed)
         self.set_player()
         self.trade_count = 0
         self.played_development_card = False
@@ -32,27 +34,13 @@ class Turn():
             f"Starting move {self.game.move}. "
             f"Player {self.player.name} to move")
 
-    def execute_dice_roll(self):
-        self.set_dice_result()
-        #self.distribute_resources_tiles()
-
     def distribute_resources_tiles(self):
         self.log.debug("Distributing resource tiles")
-        for tile in self.game.board.tiles:
-            if tile.number == self.dice:
-                self.distribute_resources_tile(tile)
-                break
+        resources_gained = self.game.production.get_resources_gained(self.dice)
+        self.game.update_state_resources(resources_gained)
 
-    def distribute_resources_tile(self, tile):
-        for player in self.game.players:
-            resources_gained = player.get_resources_gained(tile)
-            if resources_gained != 0:
-                self.game.update_state(tile.type, {player: resources_gained})
-            
     def set_dice_result(self):
-        dice_1 = np.random.randint(1, 7)
-        dice_2 = np.random.randint(1, 7)
-        self.dice = dice_1 + dice_2
+        self.dice = self.game.random.dice.roll()
         self.log.info(
             f"Dice result: {self.dice}")
 
@@ -68,49 +56,58 @@ class Turn():
 
     def init_trade_cycle(self):
         self.traded_this_cycle = False
-        self.log.debug(f"Begining trading cycle {self.trade_count + 1}")
+        self.log.debug("Begining trading cycle %s", self.trade_count + 1)
         self.player.trade = Trade(self, self.player)
         self.player.set_cards()
 
     def continue_exploring_trades(self):
         if self.trade_count > self.trade_limit:
-            self.log.debug(f"Trade limit reached")
+            self.log.debug("Trade limit reached")
             return False
         else:
-            self.log.debug(f"Trade limit unreached. {self.traded_this_cycle=}")
+            self.log.debug(
+                "Trade limit unreached. self.traded_this_cycle=%s", self.traded_this_cycle)
             return self.traded_this_cycle
 
     def generate_possible_trades(self):
         self.init_trade_cycle()
         self.log.debug("Generating possible trades")
         #self.generate_trades_with_players()
+        self.generate_trades_bank()
         self.generate_trades_assets()
         #self.generate_trades_play_development_card()
-        self.log.debug((
-            "Generated possible trades:\n"
-            f"{self.player.trade.actions.to_string()}"))
+        self.log.debug(
+            "Generated possible trades:\n%s",
+            LazyMessage(
+                self.player.trade.actions.to_string,
+                [player.name for player in self.game.players]))
 
     def generate_trades_with_players(self):
         self.log.debug("Considering trades with other players")
         for other_perspective in self.player.perspectives[1:2]:
             self.other = other_perspective.them
-            self.log.debug(f"Considering trades with {self.other.name}")
+            self.log.debug("Considering trades with %s", self.other.name)
             self.trade_with_player()
 
+    # Trades are considered one chunk at a time. The actions of every
+    # chunk are added to the trade of this cycle, while the states of a
+    # chunk are replaced by those of the next.
     def trade_with_player(self):
-        self.other.trade = Trade(self, self.other)
         self.set_all_cards()
-        self.set_card_trades()
-        self.count = len(self.player.card_trades["Sheep"])
-        self.update_trade_cards()
-        self.other.trade.stack_real_estate(self.count)
+        self.other.trade = Trade(self, self.other)
+        for card_trades in self.get_card_trades():
+            self.set_card_trades(card_trades)
+            self.count = len(self.player.card_trades["Sheep"])
+            self.player.trade.init_states(self.count)
+            self.other.trade.init_states(self.count)
+            self.update_trade_cards()
 
     def set_all_cards(self):
         self.other.set_cards()
         self.set_cards_total()
         self.log.debug(
-            f"Total cards between {self.player.name} and {self.other.name}:\n"
-            f"{json.dumps(self.cards_total)}")
+            "Total cards between %s and %s:\n%s", self.player.name,
+            self.other.name, LazyMessage(get_json_string, self.cards_total))
 
     def set_cards_total(self):
         self.cards_total = {
@@ -119,23 +116,19 @@ class Turn():
                 self.other.cards[card_type])
             for card_type in card_types}
 
-    def set_card_trades(self):
-        card_trades = self.get_card_trades()
+    def set_card_trades(self, card_trades):
         self.set_card_trades_player(card_trades)
         self.set_card_trades_other()
 
     def get_card_trades(self):
-        ranges = [
-            np.arange(total + 1) if card_type in resource_types else zero
-            for card_type, total in self.cards_total.items()]
-        trades = [np.ravel(grid) for grid in np.meshgrid(*ranges)]
-        trades = dict(zip(card_types, trades))
-        return trades
+        card_trades = get_trade_chunks(
+            self.player.cards, self.other.cards,
+            chunk_size=self.trade_chunk_size,
+            max_cards_moved=self.max_cards_traded)
+        return card_trades
 
     def set_card_trades_player(self, card_trades):
-        self.player.card_trades = {
-            card_type: (card_trades[card_type] - self.player.cards[card_type])
-            for card_type in card_types}
+        self.player.card_trades = card_trades
 
     def set_card_trades_other(self):
         self.other.card_trades = {
@@ -163,30 +156,66 @@ class Turn():
     def update_states(self, card_type, actor_changes):
         for player in actor_changes:
             for perspective in player.perspectives:
-                perspective.update_states(
-                    card_type, actor_changes, self.count)
+                perspective.update_states(card_type, actor_changes)
+
 
+    def generate_trades_bank(self):
+        self.log.debug("Considering trades with the bank")
+        bank_trades = self.game.maritime.get_trades(
+            self.player, self.player.cards, self.max_bank_trades)
+        self.player.trade.update_actions_bank(bank_trades)
 
     def generate_trades_assets(self):
         self.log.debug("Considering buying assets")
-        self.set_vertices_and_edges()
+        if self.game.bitboard:
+            self.set_real_estate_masks()
+        else:
+            self.set_legal_placements()
         self.generate_trades_road()
         self.generate_trades_settlement()
         self.generate_trades_city()
 
-    def set_vertices_and_edges(self):
-        edges_indexes = np.nonzero(self.player.real_estate["Roads"])
-        self.edges = self.game.board.edges[edges_indexes]
-        self.vertices = get_vertices_from_edges(self.edges)
+    def set_legal_placements(self):
+        self.legal_placements = get_legal_placements(
+            self.game.board.topology, self.game.get_real_estate(),
+            self.game.players.index(self.player))
+
+    def set_real_estate_masks(self):
+        self.bitboard = self.game.board.bitboard
+        self.masks = self.player.real_estate_masks
+        self.masks_vertices = self.masks["Settlements"] | self.masks["Cities"]
+        self.occupied_vertices = 0
+        self.occupied_edges = 0
+        for player in self.game.players:
+            self.occupied_vertices |= (
+                player.real_estate_masks["Settlements"] |
+                player.real_estate_masks["Cities"])
+            self.occupied_edges |= player.real_estate_masks["Roads"]
 
     def generate_trades_road(self):
-        self.roads = get_buildable_roads(self.edges)
+        if self.game.bitboard:
+            self.roads = get_indexes(self.bitboard.get_buildable_roads(
+                self.masks["Roads"], self.masks_vertices,
+                self.occupied_vertices & ~self.masks_vertices,
+                self.occupied_edges))
+        else:
+            self.roads = np.nonzero(self.legal_placements["Roads"])[0]
+        self.road_lengths = self.game.longest_road.get_lengths_with_roads(
+            self.player, self.roads)
 
     def generate_trades_settlement(self):
-        pass
+        if self.game.bitboard:
+            self.settlements = get_indexes(self.bitboard.get_buildable_settlements(
+                self.masks["Roads"], self.occupied_vertices))
+        else:
+            self.settlements = np.nonzero(self.legal_placements["Settlements"])[0]
 
     def generate_trades_city(self):
-        pass
+        if self.game.bitboard:
+            self.cities = get_indexes(self.bitboard.get_buildable_cities(
+                self.masks["Settlements"], self.masks["Cities"]))
+        else:
+            self.cities = np.nonzero(self.legal_placements["Cities"])[0]
 
     def generate_trades_play_development_card(self):
         if not self.played_development_card:
@@ -6,6 +6,16 @@ def get_name(name=None):
         name = time.strftime("%Y_%M_%d__%H_%M")
     return name
 
+# hgutilities imports matplotlib, so it is only imported when JSON is
+# written for people to read rather than whenever a module is imported.
+def dump_json(data, file):
+    from hgutilities.utils import json
+    json.dump(data, file, indent=2)
+
+def get_json_string(data):
+    from hgutilities.utils import json
+    return json.dumps(data)
+
 def get_change_str(change):
     change = int(change)
     if change >= 0: